@@ -0,0 +1,60 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+GENERATION_KEY = 'generation:{}'
+# v2: в кеше хранятся данные ответа вместе с версией для ETag.
+RESPONSE_KEY = 'response:v2:{}:{}:{}'
+
+
+def get_response_cache():
+    if settings.RESPONSE_CACHE is None:
+        return None
+    return caches[settings.RESPONSE_CACHE]
+
+
+def get_generation_keys(models) -> list:
+    return [GENERATION_KEY.format(model._meta.label_lower) for model in models]
+
+
+def get_generations(cache, models) -> list:
+    """Поколения моделей одним обращением к кешу.
+
+    Отсутствующее поколение заводится от текущего времени, а не с нуля:
+    если ключ вытеснен из кеша, старые ответы не совпадут с новыми ключами.
+    """
+    keys = get_generation_keys(models)
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, time.time_ns(), timeout=None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def bump_generations(*models) -> None:
+    """Делает недействительными все закешированные ответы, зависящие от
+    моделей, не удаляя их: ответы старых поколений истекают сами."""
+    cache = get_response_cache()
+    if cache is None:
+        return
+    for key in get_generation_keys(models):
+        try:
+            cache.incr(key)
+        except ValueError:
+            if not cache.add(key, time.time_ns(), timeout=None):
+                cache.incr(key)
+
+
+def get_response_key(cache, view, request) -> str:
+    generations = '.'.join(
+        map(str, get_generations(cache, view.cache_models))
+    )
+    uri = hashlib.md5(
+        request.build_absolute_uri().encode('utf8')
+    ).hexdigest()
+    return RESPONSE_KEY.format(
+        f'{type(view).__name__}.{view.action}', generations, uri
+    )
@@ -1,5 +1,6 @@
 import django_filters
 from reviews.models import Title
+from reviews.search import search_titles
 
 
 class TitleFilter(django_filters.FilterSet):
@@ -9,7 +10,13 @@ class TitleFilter(django_filters.FilterSet):
     genre = django_filters.CharFilter(field_name='genre__slug')
     category = django_filters.CharFilter(field_name='category__slug')
     year = django_filters.NumberFilter(field_name='year')
+    search = django_filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Title
-        fields = ('name', 'genre', 'category', 'year')
+        fields = ('name', 'genre', 'category', 'year', 'search')
+
+    def filter_search(self, queryset, name, value):
+        """Поиск по словам названия и описания с сортировкой по
+        релевантности; в курсорной пагинации порядок задаёт она."""
+        return search_titles(queryset, value)
@@ -0,0 +1,304 @@
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Callable, NamedTuple, Optional
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.db.models import Count
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.settings import api_settings
+from rest_framework.test import APIClient
+from reviews.models import Review, Title
+from users.models import EmailOutbox
+
+ITERATIONS = 200
+WARMUP = 10
+BENCHMARK_CODE = 'benchmark'
+PERCENTILES = {'p50': 49, 'p95': 94, 'p99': 98}
+
+User = get_user_model()
+
+
+class Scenario(NamedTuple):
+    name: str
+    method: str
+    url: str
+    data: Optional[Callable[[int], dict]] = None
+
+
+class Command(BaseCommand):
+
+    help = '''Measures Latency and Queries per Request of the API Endpoints
+In-Process Against the Current Database and Writes a JSON Report. Writes
+Made by the Benchmark Are Rolled Back, or Deleted When Run in Threads'''
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--iterations', type=int, default=ITERATIONS)
+        parser.add_argument('--warmup', type=int, default=WARMUP)
+        parser.add_argument(
+            '--only',
+            nargs='+',
+            help='Names of Scenarios to Run',
+        )
+        parser.add_argument(
+            '--output', type=Path, help='Path of the JSON Report'
+        )
+        parser.add_argument(
+            '--compare',
+            type=Path,
+            help='Previous JSON Report to Print the Difference With',
+        )
+        parser.add_argument(
+            '--label', default='', help='Label Stored in the Report'
+        )
+        parser.add_argument(
+            '--response-cache',
+            metavar='CACHE',
+            help='''Name of the Cache from CACHES Used for API Responses;
+Disabled by Default So That Scenarios Measure the ORM and Serializers''',
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=1,
+            help='''Number of Threads Sending the Requests of Each Scenario
+Concurrently, Each with Its Own Database Connection; Failed Requests Are
+Counted Instead of Stopping the Run''',
+        )
+
+    @override_settings(
+        EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+        ALLOWED_HOSTS=['testserver'],
+    )
+    def handle(self, *args, **options) -> None:
+        if options['iterations'] < 2:
+            raise CommandError('--iterations Must Be at Least 2')
+        if options['threads'] < 1:
+            raise CommandError('--threads Must Be at Least 1')
+        results = {}
+        # Соединения рабочих потоков не видят транзакцию основного потока,
+        # поэтому в многопоточном режиме записи фиксируются и созданные
+        # строки удаляются после прогона.
+        threaded = options['threads'] > 1
+        created = self.get_last_ids() if threaded else None
+        try:
+            with override_settings(
+                RESPONSE_CACHE=options['response_cache']
+            ), nullcontext() if threaded else transaction.atomic():
+                for scenario in self.get_scenarios():
+                    if options['only'] and (
+                        scenario.name not in options['only']
+                    ):
+                        continue
+                    results[scenario.name] = self.run(
+                        scenario, options['iterations'], options['warmup'],
+                        options['threads']
+                    )
+                    self.print_result(scenario.name, results[scenario.name])
+                if not threaded:
+                    transaction.set_rollback(True)
+        finally:
+            if threaded:
+                self.delete_created(created)
+
+        report = {
+            'label': options['label'],
+            'iterations': options['iterations'],
+            'response_cache': options['response_cache'],
+            'threads': options['threads'],
+            'results': results,
+        }
+        if options['output']:
+            options['output'].write_text(
+                json.dumps(report, indent=2, ensure_ascii=False)
+            )
+        if options['compare']:
+            self.print_comparison(
+                json.loads(options['compare'].read_text()), report
+            )
+
+    def get_scenarios(self) -> list:
+        title = Title.objects.order_by('-rating_count').first()
+        if title is None:
+            raise CommandError(
+                'Database Is Empty, Run populate_db or generate_data First'
+            )
+        genre = title.genre.first()
+        review = Review.objects.filter(title=title).annotate(
+            comment_count=Count('comments')
+        ).order_by('-comment_count').first()
+
+        user, _ = User.objects.get_or_create(
+            username='benchmark', defaults={'email': 'benchmark@yamdb.fake'}
+        )
+        user.confirmation_code = BENCHMARK_CODE
+        user.save()
+
+        titles_url = '/api/v1/titles/'
+        last_page = max(1, -(-Title.objects.count() // api_settings.PAGE_SIZE))
+        scenarios = [
+            Scenario('titles_list', 'get', titles_url),
+            Scenario('titles_list_last_page', 'get',
+                     f'{titles_url}?page={last_page}'),
+            Scenario('titles_retrieve', 'get', f'{titles_url}{title.pk}/'),
+            Scenario('titles_filter_year', 'get',
+                     f'{titles_url}?year={title.year}'),
+            Scenario('titles_filter_name', 'get',
+                     f'{titles_url}?name={title.name[:3]}'),
+            Scenario('titles_search', 'get',
+                     f'{titles_url}?search={title.name.split()[0]}'),
+            Scenario('titles_search_terms', 'get',
+                     f'{titles_url}?{urlencode({"search": title.name})}'),
+            Scenario('titles_facets', 'get', f'{titles_url}facets/'),
+            Scenario('titles_facets_filtered', 'get',
+                     f'{titles_url}facets/?year={title.year}'),
+            Scenario('categories_list', 'get', '/api/v1/categories/'),
+            Scenario('genres_list', 'get', '/api/v1/genres/'),
+        ]
+        if title.category_id:
+            scenarios.append(Scenario(
+                'titles_filter_category', 'get',
+                f'{titles_url}?category={title.category.slug}'
+            ))
+        if genre:
+            scenarios.append(Scenario(
+                'titles_filter_genre', 'get',
+                f'{titles_url}?genre={genre.slug}'
+            ))
+        if review:
+            reviews_url = f'{titles_url}{title.pk}/reviews/'
+            scenarios += [
+                Scenario('reviews_list', 'get', reviews_url),
+                Scenario('reviews_list_cursor', 'get',
+                         f'{reviews_url}?pagination=cursor'),
+                Scenario('comments_list', 'get',
+                         f'{reviews_url}{review.pk}/comments/'),
+            ]
+        scenarios += [
+            Scenario('signup', 'post', '/api/v1/auth/signup/', lambda i: {
+                'username': f'benchmark{i}',
+                'email': f'benchmark{i}@yamdb.fake',
+            }),
+            Scenario('token', 'post', '/api/v1/auth/token/', lambda i: {
+                'username': user.username,
+                'confirmation_code': BENCHMARK_CODE,
+            }),
+        ]
+        return scenarios
+
+    def run(self, scenario: Scenario, iterations: int, warmup: int,
+            threads: int = 1) -> dict:
+        self.measure(scenario, range(warmup))
+        indexes = range(warmup, warmup + iterations)
+        started = time.perf_counter()
+        if threads == 1:
+            samples = [self.measure(scenario, indexes)]
+        else:
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                samples = list(pool.map(
+                    lambda start: self.measure_in_thread(
+                        scenario, indexes[start::threads]
+                    ),
+                    range(threads)
+                ))
+        elapsed = time.perf_counter() - started
+        timings = [timing for sample in samples for timing in sample[0]]
+        queries = [count for sample in samples for count in sample[1]]
+        errors = sum(sample[2] for sample in samples)
+        if len(timings) < 2:
+            raise CommandError(f'{scenario.name}: All Requests Failed')
+
+        quantiles = statistics.quantiles(timings, n=100)
+        result = {
+            'url': scenario.url,
+            'method': scenario.method.upper(),
+            'mean_ms': round(statistics.mean(timings), 3),
+            'queries': round(statistics.mean(queries), 2),
+            'requests_per_second': round(len(timings) / elapsed, 1),
+            'errors': errors,
+        }
+        for name, index in PERCENTILES.items():
+            result[f'{name}_ms'] = round(quantiles[index], 3)
+        return result
+
+    def measure(self, scenario: Scenario, indexes: range,
+                strict: bool = True) -> tuple:
+        """Время и число запросов к базе для каждого успешного запроса и
+        число неудачных. В строгом режиме первая же ошибка прерывает
+        прогон."""
+        client = APIClient()
+        client.raise_request_exception = strict
+        request = getattr(client, scenario.method)
+        timings, queries, errors = [], [], 0
+        for index in indexes:
+            data = scenario.data(index) if scenario.data else None
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = request(scenario.url, data=data)
+                elapsed = time.perf_counter() - started
+            if response.status_code < 400:
+                timings.append(elapsed * 1000)
+                queries.append(len(captured))
+            elif strict:
+                raise CommandError(
+                    f'{scenario.name}: {scenario.method.upper()} '
+                    f'{scenario.url} Returned {response.status_code}'
+                )
+            else:
+                errors += 1
+        return timings, queries, errors
+
+    def measure_in_thread(self, scenario: Scenario, indexes: range) -> tuple:
+        try:
+            return self.measure(scenario, indexes, strict=False)
+        finally:
+            connections.close_all()
+
+    @staticmethod
+    def get_last_ids() -> dict:
+        return {
+            model: model.objects.order_by('-pk').values_list(
+                'pk', flat=True
+            ).first() or 0
+            for model in (User, EmailOutbox)
+        }
+
+    @staticmethod
+    def delete_created(last_ids: dict) -> None:
+        for model, last_id in last_ids.items():
+            model.objects.filter(pk__gt=last_id).delete()
+
+    def print_result(self, name: str, result: dict) -> None:
+        self.stdout.write(
+            f'{name:<24} p50 {result["p50_ms"]:>8.2f} ms  '
+            f'p95 {result["p95_ms"]:>8.2f} ms  '
+            f'p99 {result["p99_ms"]:>8.2f} ms  '
+            f'queries {result["queries"]:>6}  '
+            f'{result["requests_per_second"]:>8.1f} req/s'
+            + (f'  errors {result["errors"]}' if result['errors'] else '')
+        )
+
+    def print_comparison(self, previous: dict, current: dict) -> None:
+        self.stdout.write(
+            f'Compared with {previous.get("label") or "Previous Report"}:'
+        )
+        for name, result in current['results'].items():
+            before = previous['results'].get(name)
+            if before is None:
+                continue
+            change = (
+                (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100
+                if before['p50_ms'] else 0
+            )
+            style = self.style.SUCCESS if change <= 0 else self.style.WARNING
+            self.stdout.write(style(
+                f'{name:<24} p50 {change:>+7.1f}%  queries '
+                f'{before["queries"]} -> {result["queries"]}'
+            ))
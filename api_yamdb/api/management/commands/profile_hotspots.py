@@ -0,0 +1,117 @@
+import pstats
+from collections import Counter
+from io import StringIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.profiling import PROFILE_SUFFIX, STACKS_SUFFIX
+
+LIMIT = 20
+ALL_ROUTES = 'all routes'
+
+
+def read_stacks(paths: list):
+    """Складывает свёрнутые стеки: сколько раз функция была листом стека
+    (собственное время) и сколько раз встречалась в нём (общее время)."""
+    own = Counter()
+    total = Counter()
+    samples = 0
+    for path in paths:
+        for line in path.read_text().splitlines():
+            stack, _, count = line.rpartition(' ')
+            frames = stack.split(';')
+            count = int(count)
+            samples += count
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+    return own, total, samples
+
+
+class Command(BaseCommand):
+
+    help = '''Aggregates Request Profiles Stored by ProfilingMiddleware and
+Prints the Top Hotspots per Route'''
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--path',
+            type=Path,
+            help='Directory with Stored Profiles, PROFILING_DIR by Default',
+        )
+        parser.add_argument(
+            '--route',
+            nargs='+',
+            help='Only These Routes, e.g. TitleViewSet.list',
+        )
+        parser.add_argument('--limit', type=int, default=LIMIT)
+        parser.add_argument(
+            '--sort',
+            choices=('tottime', 'cumulative'),
+            default='tottime',
+            help='Order of cProfile Hotspots',
+        )
+        parser.add_argument(
+            '--merge',
+            action='store_true',
+            help='Aggregate All Routes Together',
+        )
+
+    def handle(self, *args, **options) -> None:
+        path = options['path'] or Path(settings.PROFILING_DIR)
+        if not path.is_dir():
+            raise CommandError(f'Directory {path} Not Found')
+        routes = {
+            route.name: sorted(route.iterdir())
+            for route in sorted(path.iterdir())
+            if route.is_dir()
+            and (not options['route'] or route.name in options['route'])
+        }
+        if not any(routes.values()):
+            raise CommandError('No Stored Profiles Found')
+        if options['merge']:
+            routes = {
+                ALL_ROUTES: [
+                    file for files in routes.values() for file in files
+                ]
+            }
+        for route, files in routes.items():
+            self.report_profiles(
+                route,
+                [file for file in files if file.suffix == PROFILE_SUFFIX],
+                options,
+            )
+            self.report_stacks(
+                route,
+                [file for file in files if file.suffix == STACKS_SUFFIX],
+                options['limit'],
+            )
+
+    def report_profiles(self, route: str, files: list, options: dict):
+        if not files:
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'{route}: {len(files)} cProfile Profile(s)'
+        ))
+        # OutputWrapper добавляет перевод строки к каждой записи, а pstats
+        # пишет строки по частям.
+        output = StringIO()
+        stats = pstats.Stats(*map(str, files), stream=output)
+        stats.sort_stats(options['sort']).print_stats(options['limit'])
+        self.stdout.write(output.getvalue(), ending='')
+
+    def report_stacks(self, route: str, files: list, limit: int) -> None:
+        if not files:
+            return
+        own, total, samples = read_stacks(files)
+        self.stdout.write(self.style.SUCCESS(
+            f'{route}: {len(files)} Slow Request(s), {samples} Stack Samples'
+        ))
+        self.stdout.write(f'{"own":>7} {"total":>7}  function')
+        for frame, count in own.most_common(limit):
+            self.stdout.write(
+                f'{count / samples:>7.1%} {total[frame] / samples:>7.1%}  '
+                f'{frame}'
+            )
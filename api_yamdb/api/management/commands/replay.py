@@ -0,0 +1,506 @@
+import json
+import re
+import statistics
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from pathlib import Path
+from typing import NamedTuple, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from .benchmark import PERCENTILES
+
+BASE_URL = 'http://127.0.0.1:8000'
+CONCURRENCY = 1
+TIMEOUT = 30
+LOG_SUFFIX = '.jsonl'
+CODE_SUFFIX = 'ConfirmationCode'
+EMAIL_SUFFIX = 'Email'
+VARIABLE = re.compile(r'{{\s*(\w+)\s*}}')
+ID_SEGMENT = re.compile(r'/\d+(?=/|$)')
+# Проверки статуса и сохранение переменных в тестах коллекции.
+STATUS_CHECK = re.compile(
+    r'pm\.response\.status\b.*?\.to\.be\.eql\(\s*["\']([^"\']+)["\']', re.S
+)
+RESPONSE_FIELD = re.compile(
+    r'(?:const|let|var)\s+(\w+)\s*=\s*'
+    r'_\.get\(responseData,\s*["\'](\w+)["\']\)'
+)
+CAPTURE = re.compile(
+    r'pm\.collectionVariables\.set\(\s*["\'](\w+)["\']\s*,\s*(\w+)\s*\)'
+)
+STATUS_BY_PHRASE = {status.phrase: status.value for status in HTTPStatus}
+
+User = get_user_model()
+
+_local = threading.local()
+
+
+class Step(NamedTuple):
+    name: str
+    method: str
+    url: str
+    body: Optional[str] = None
+    headers: tuple = ()
+    expected: Optional[int] = None
+    captures: tuple = ()
+    offset: Optional[float] = None
+
+
+class Sample(NamedTuple):
+    elapsed_ms: float
+    status: Optional[int]
+    ok: bool
+    lag_ms: float = 0
+
+
+def send(method: str, url: str, body: Optional[str], headers: dict,
+         timeout: float, scheduled: Optional[float] = None):
+    """Выполняет запрос через сессию текущего потока.
+
+    Возвращает время ответа в миллисекундах, отставание отправки от
+    расписания и ответ либо текст ошибки соединения. Если задано время
+    scheduled, по расписанию которого запрос должен был уйти, время ответа
+    отсчитывается от него: иначе задержка в очереди занятого сервера
+    выпадала бы из перцентилей.
+    """
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = _local.session = requests.Session()
+    started = time.perf_counter()
+    origin = started if scheduled is None else min(scheduled, started)
+    lag_ms = (started - origin) * 1000
+    try:
+        response = session.request(
+            method,
+            url,
+            data=body.encode('utf8') if body else None,
+            headers=headers,
+            timeout=timeout,
+        )
+    except requests.RequestException as error:
+        response = str(error)
+    return (time.perf_counter() - origin) * 1000, lag_ms, response
+
+
+def render(template: str, variables: dict) -> str:
+    """Подставляет переменные ``{{name}}``; неизвестные остаются как есть,
+    как и в Postman."""
+    return VARIABLE.sub(
+        lambda match: str(variables.get(match.group(1), match.group(0))),
+        template,
+    )
+
+
+def rebase(url: str, base_url: str) -> str:
+    base = urlsplit(base_url)
+    parts = urlsplit(url)
+    return urlunsplit((
+        base.scheme, base.netloc, base.path.rstrip('/') + parts.path,
+        parts.query, ''
+    ))
+
+
+def percentiles(timings: list) -> dict:
+    if len(timings) < 2:
+        return {name: timings[0] if timings else 0 for name in PERCENTILES}
+    quantiles = statistics.quantiles(timings, n=100, method='inclusive')
+    return {name: quantiles[index] for name, index in PERCENTILES.items()}
+
+
+def postman_step(item: dict, name: str, auth: Optional[dict]) -> Step:
+    request = item['request']
+    auth = request.get('auth', auth)
+    headers = {
+        header['key']: header['value']
+        for header in request.get('header', [])
+        if not header.get('disabled')
+    }
+    if auth and auth.get('type') == 'bearer':
+        token = {
+            entry['key']: entry['value'] for entry in auth['bearer']
+        }.get('token', '')
+        headers['Authorization'] = f'Bearer {token}'
+    body = request.get('body') or {}
+    raw = body.get('raw') if body.get('mode') == 'raw' else None
+    if raw:
+        headers.setdefault('Content-Type', 'application/json')
+
+    script = '\n'.join(
+        line
+        for event in item.get('event', []) if event['listen'] == 'test'
+        for line in event['script']['exec']
+    )
+    status = STATUS_CHECK.search(script)
+    fields = dict(RESPONSE_FIELD.findall(script))
+    url = request['url']
+    return Step(
+        name=name,
+        method=request['method'],
+        url=url['raw'] if isinstance(url, dict) else url,
+        body=raw or None,
+        headers=tuple(headers.items()),
+        expected=STATUS_BY_PHRASE.get(status.group(1)) if status else None,
+        captures=tuple(
+            (variable, fields.get(local, local))
+            for variable, local in CAPTURE.findall(script)
+        ),
+    )
+
+
+def walk_postman(items: list, folders: tuple, auth: Optional[dict]):
+    for item in items:
+        if 'item' in item:
+            yield from walk_postman(
+                item['item'], folders + (item['name'],),
+                item.get('auth', auth)
+            )
+        else:
+            yield postman_step(
+                item, '/'.join(folders + (item['name'],)), auth
+            )
+
+
+def read_postman(path: Path):
+    """Читает коллекцию Postman v2.1: запросы в порядке выполнения и
+    переменные коллекции."""
+    collection = json.loads(path.read_text(encoding='utf8'))
+    variables = {
+        variable['key']: variable.get('value', '')
+        for variable in collection.get('variable', [])
+    }
+    return list(
+        walk_postman(collection['item'], (), collection.get('auth'))
+    ), variables
+
+
+def log_step(record: dict, first_time: Optional[float]) -> Step:
+    url = record.get('path') or record['url']
+    method = record.get('method', 'GET').upper()
+    body = record.get('body')
+    headers = dict(record.get('headers') or {})
+    if body is not None and not isinstance(body, str):
+        body = json.dumps(body, ensure_ascii=False)
+        headers.setdefault('Content-Type', 'application/json')
+    recorded = record.get('time')
+    return Step(
+        name=record.get('name') or (
+            f'{method} {ID_SEGMENT.sub("/{id}", urlsplit(url).path)}'
+        ),
+        method=method,
+        url=url,
+        body=body,
+        headers=tuple(headers.items()),
+        expected=record.get('status'),
+        offset=(
+            recorded - first_time
+            if recorded is not None and first_time is not None else None
+        ),
+    )
+
+
+def read_log(path: Path) -> list:
+    """Читает журнал запросов: по объекту JSON в строке с полями method,
+    path (или url), а также необязательными body, headers, status, time
+    (секунды) и name."""
+    steps = []
+    first_time = None
+    with open(path, encoding='utf8') as file:
+        for number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                if first_time is None:
+                    first_time = record.get('time')
+                steps.append(log_step(record, first_time))
+            except (ValueError, KeyError, TypeError) as error:
+                raise CommandError(f'{path}:{number}: Bad Record: {error}')
+    return steps
+
+
+class Command(BaseCommand):
+
+    help = '''Replays the Postman Collection or Recorded JSONL Request Logs
+Against a Running Server with Configurable Concurrency and Rate and Reports
+Latency Distribution and Error Rate per Request'''
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            'sources',
+            nargs='+',
+            type=Path,
+            help='Postman Collections (.json) or Request Logs (.jsonl)',
+        )
+        parser.add_argument('--base-url', default=BASE_URL)
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=CONCURRENCY,
+            help='Maximum Number of Requests in Flight',
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            help='''Requests per Second to Start; Latency Is Measured from
+the Scheduled Start''',
+        )
+        parser.add_argument(
+            '--speed',
+            type=float,
+            help='''Replay Recorded Log Timing Sped up by This Factor;
+Latency Is Measured from the Scheduled Start''',
+        )
+        parser.add_argument('--repeat', type=int, default=1)
+        parser.add_argument(
+            '--folder',
+            nargs='+',
+            help='Only Replay Requests Whose Name Starts with These',
+        )
+        parser.add_argument(
+            '--methods', nargs='+', help='Only Replay These HTTP Methods'
+        )
+        parser.add_argument(
+            '--var',
+            action='append',
+            default=[],
+            metavar='NAME=VALUE',
+            help='Set a Collection Variable',
+        )
+        parser.add_argument(
+            '--codes-from-db',
+            action='store_true',
+            help='Read Confirmation Codes from the Database of This Project',
+        )
+        parser.add_argument('--timeout', type=float, default=TIMEOUT)
+        parser.add_argument(
+            '--max-error-rate',
+            type=float,
+            help='Fail if the Share of Failed Requests Exceeds This',
+        )
+        parser.add_argument(
+            '--output', type=Path, help='Path of the JSON Report'
+        )
+        parser.add_argument(
+            '--label', default='', help='Label Stored in the Report'
+        )
+
+    def handle(self, *args, **options) -> None:
+        if options['concurrency'] < 1 or options['repeat'] < 1:
+            raise CommandError('--concurrency and --repeat Must Be Positive')
+        if options['rate'] and options['speed']:
+            raise CommandError('--rate and --speed Are Mutually Exclusive')
+        self.options = options
+        self.variables = {}
+        steps = self.filter(self.load(options['sources']))
+        if not steps:
+            raise CommandError('Nothing to Replay')
+        for assignment in options['var']:
+            name, sep, value = assignment.partition('=')
+            if not sep:
+                raise CommandError(f'Bad --var {assignment}, Use NAME=VALUE')
+            self.variables[name] = value
+
+        self.samples = defaultdict(list)
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(options['concurrency'])
+        started = time.perf_counter()
+        self.replay(steps * options['repeat'], started)
+        report = self.report(time.perf_counter() - started)
+
+        if options['output']:
+            options['output'].write_text(
+                json.dumps(report, indent=2, ensure_ascii=False)
+            )
+        if (
+            options['max_error_rate'] is not None
+            and report['total']['error_rate'] > options['max_error_rate']
+        ):
+            raise CommandError(
+                f'Error Rate {report["total"]["error_rate"]:.2%} Exceeds '
+                f'{options["max_error_rate"]:.2%}'
+            )
+
+    def load(self, sources: list) -> list:
+        steps = []
+        for path in sources:
+            if not path.is_file():
+                raise CommandError(f'File {path} Not Found')
+            if path.suffix == LOG_SUFFIX:
+                steps += read_log(path)
+                continue
+            collection_steps, variables = read_postman(path)
+            steps += collection_steps
+            self.variables.update(variables)
+        return steps
+
+    def filter(self, steps: list) -> list:
+        folders = self.options['folder']
+        methods = {
+            method.upper() for method in self.options['methods'] or ()
+        }
+        return [
+            step for step in steps
+            if (not folders or step.name.startswith(tuple(folders)))
+            and (not methods or step.method in methods)
+        ]
+
+    def replay(self, steps: list, started: float) -> None:
+        """Запускает запросы по порядку, не больше --concurrency
+        одновременно. Запрос, из ответа которого сохраняются переменные,
+        выполняется после завершения всех предыдущих, а следующие ждут
+        его ответа."""
+        with ThreadPoolExecutor(self.options['concurrency']) as pool:
+            for index, step in enumerate(steps):
+                scheduled = self.wait_turn(step, index, started)
+                if step.captures:
+                    self.drain()
+                self.slots.acquire()
+                future = pool.submit(send, *self.prepare(step), scheduled)
+                future.add_done_callback(
+                    lambda done, step=step: self.finish(step, done)
+                )
+                if step.captures:
+                    self.drain()
+
+    def wait_turn(
+        self, step: Step, index: int, started: float
+    ) -> Optional[float]:
+        """Ждёт времени запроса по --rate или --speed и возвращает его."""
+        if self.options['rate']:
+            due = index / self.options['rate']
+        elif self.options['speed'] and step.offset is not None:
+            due = step.offset / self.options['speed']
+        else:
+            return None
+        scheduled = started + due
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        return scheduled
+
+    def drain(self) -> None:
+        """Дожидается завершения всех запущенных запросов."""
+        for _ in range(self.options['concurrency']):
+            self.slots.acquire()
+        for _ in range(self.options['concurrency']):
+            self.slots.release()
+
+    def prepare(self, step: Step) -> tuple:
+        if self.options['codes_from_db']:
+            self.read_codes(step)
+        headers = {
+            key: render(value, self.variables) for key, value in step.headers
+        }
+        return (
+            step.method,
+            rebase(render(step.url, self.variables), self.options['base_url']),
+            render(step.body, self.variables) if step.body else None,
+            headers,
+            self.options['timeout'],
+        )
+
+    def read_codes(self, step: Step) -> None:
+        """Берёт коды подтверждения из базы по адресу, сохранённому в
+        переменной <роль>Email, вместо ручного заполнения переменных
+        <роль>ConfirmationCode."""
+        for name in VARIABLE.findall(step.body or ''):
+            if not name.endswith(CODE_SUFFIX):
+                continue
+            email = self.variables.get(name[:-len(CODE_SUFFIX)] + EMAIL_SUFFIX)
+            code = User.objects.filter(email=email).values_list(
+                'confirmation_code', flat=True
+            ).first()
+            if code:
+                self.variables[name] = code
+
+    def finish(self, step: Step, future) -> None:
+        try:
+            elapsed_ms, lag_ms, response = future.result()
+            status = getattr(response, 'status_code', None)
+            if status is None:
+                ok = False
+            elif step.expected:
+                ok = status == step.expected
+            else:
+                ok = status < HTTPStatus.INTERNAL_SERVER_ERROR
+            with self.lock:
+                self.samples[step.name].append(
+                    Sample(elapsed_ms, status, ok, lag_ms)
+                )
+                if ok and step.captures:
+                    self.capture(step, response)
+        finally:
+            self.slots.release()
+
+    def capture(self, step: Step, response) -> None:
+        try:
+            data = response.json()
+        except ValueError:
+            return
+        for variable, field in step.captures:
+            if isinstance(data, dict) and field in data:
+                self.variables[variable] = data[field]
+
+    def summarize(self, samples: list) -> dict:
+        timings = [sample.elapsed_ms for sample in samples]
+        errors = sum(not sample.ok for sample in samples)
+        result = {
+            'requests': len(samples),
+            'errors': errors,
+            'error_rate': round(errors / len(samples), 4),
+            'mean_ms': round(statistics.mean(timings), 3),
+            'statuses': dict(Counter(
+                str(sample.status) for sample in samples
+            )),
+        }
+        for name, value in percentiles(timings).items():
+            result[f'{name}_ms'] = round(value, 3)
+        # Отставание отправки от расписания уже входит во время ответа.
+        lags = [sample.lag_ms for sample in samples]
+        result['lag_p99_ms'] = round(percentiles(lags)['p99'], 3)
+        result['lag_max_ms'] = round(max(lags), 3)
+        return result
+
+    def report(self, duration: float) -> dict:
+        results = {
+            name: self.summarize(samples)
+            for name, samples in self.samples.items()
+        }
+        total = self.summarize([
+            sample for samples in self.samples.values() for sample in samples
+        ])
+        total['duration_s'] = round(duration, 3)
+        total['rps'] = round(total['requests'] / duration, 2)
+
+        width = max(len(name) for name in results)
+        for name, result in results.items():
+            style = self.style.ERROR if result['errors'] else str
+            self.stdout.write(style(
+                f'{name:<{width}} x{result["requests"]:<4} '
+                f'p50 {result["p50_ms"]:>8.2f} ms  '
+                f'p95 {result["p95_ms"]:>8.2f} ms  '
+                f'p99 {result["p99_ms"]:>8.2f} ms  '
+                f'errors {result["error_rate"]:>6.1%}'
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'{total["requests"]} Requests in {total["duration_s"]} s, '
+            f'{total["rps"]} Requests/s, p50 {total["p50_ms"]:.2f} ms, '
+            f'p95 {total["p95_ms"]:.2f} ms, p99 {total["p99_ms"]:.2f} ms, '
+            f'Schedule Lag p99 {total["lag_p99_ms"]:.2f} ms, '
+            f'Errors {total["error_rate"]:.2%}'
+        ))
+        return {
+            'label': self.options['label'],
+            'base_url': self.options['base_url'],
+            'concurrency': self.options['concurrency'],
+            'rate': self.options['rate'],
+            'results': results,
+            'total': total,
+        }
@@ -0,0 +1,131 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from api_yamdb.metrics import (REQUEST_DB_DURATION, REQUEST_DURATION,
+                               REQUEST_QUERIES, RESPONSES)
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Списки IN разной длины дают один и тот же отпечаток запроса.
+IN_LIST = re.compile(r'\(%s(?:, %s)+\)')
+UNMATCHED = 'unmatched'
+
+
+class QueryBudgetExceeded(Exception):
+    """Запрос к API выполнил больше SQL-запросов, чем разрешено."""
+
+
+class QueryStats:
+    """SQL-запросы одного HTTP-запроса: число, время и повторы."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    def duplicates(self) -> dict:
+        """Отпечатки запросов, выполненных больше одного раза."""
+        fingerprints = Counter()
+        for sql, count in self.statements.items():
+            fingerprints[IN_LIST.sub('(%s...)', sql)] += count
+        return {
+            fingerprint: count
+            for fingerprint, count in fingerprints.most_common()
+            if count > 1
+        }
+
+
+def get_endpoint(request) -> str:
+    """Имя обработчика вида ``TitleViewSet.list`` для бюджетов и логов."""
+    match = request.resolver_match
+    if match is None:
+        return ''
+    view = getattr(match.func, 'cls', None)
+    if view is None:
+        return match.view_name
+    actions = getattr(match.func, 'actions', None) or {}
+    action = actions.get(request.method.lower())
+    return f'{view.__name__}.{action}' if action else view.__name__
+
+
+def get_budget(endpoint: str):
+    budgets = settings.SQL_QUERY_BUDGETS
+    return budgets.get(endpoint, budgets.get(endpoint.split('.')[0]))
+
+
+class QueryInstrumentationMiddleware:
+    """Считает SQL-запросы каждого запроса к API.
+
+    Число запросов, время в базе и отпечатки повторяющихся запросов
+    попадают в заголовок ``Server-Timing`` и в лог ``api.middleware``.
+    При превышении бюджета из ``SQL_QUERY_BUDGETS`` пишется предупреждение,
+    а если включена ``SQL_QUERY_BUDGET_RAISE`` — выбрасывается
+    ``QueryBudgetExceeded``. Те же величины попадают в метрики
+    ``api_yamdb.metrics``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = request.sql_stats = QueryStats()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        response['Server-Timing'] = (
+            f'db;dur={stats.duration * 1000:.2f};'
+            f'desc="{stats.count} queries", '
+            f'app;dur={elapsed * 1000:.2f}'
+        )
+        endpoint = get_endpoint(request)
+        self.observe(endpoint or UNMATCHED, request, response, stats, elapsed)
+        budget = get_budget(endpoint)
+        over_budget = budget is not None and stats.count > budget
+        if not over_budget and not logger.isEnabledFor(logging.DEBUG):
+            return response
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'endpoint': endpoint,
+            'status': response.status_code,
+            'queries': stats.count,
+            'db_ms': round(stats.duration * 1000, 2),
+            'total_ms': round(elapsed * 1000, 2),
+            'duplicates': stats.duplicates(),
+        }
+        if not over_budget:
+            logger.debug(json.dumps(record, ensure_ascii=False))
+            return response
+
+        record['budget'] = budget
+        logger.warning(json.dumps(record, ensure_ascii=False))
+        if settings.SQL_QUERY_BUDGET_RAISE:
+            raise QueryBudgetExceeded(
+                f'{endpoint} Made {stats.count} Queries, Budget Is {budget}'
+            )
+        return response
+
+    def observe(self, endpoint, request, response, stats, elapsed) -> None:
+        REQUEST_DURATION.observe(elapsed, endpoint, request.method)
+        RESPONSES.inc(endpoint, str(response.status_code))
+        REQUEST_QUERIES.observe(stats.count, endpoint)
+        REQUEST_DB_DURATION.observe(stats.duration, endpoint)
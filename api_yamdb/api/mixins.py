@@ -1,13 +1,172 @@
-from rest_framework import filters
+import hashlib
+
+from api_yamdb.metrics import CACHE_REQUESTS, HIT, MISS
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from rest_framework import filters, status
 from rest_framework.mixins import (CreateModelMixin, DestroyModelMixin,
                                    ListModelMixin)
+from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
+from .cache import get_response_cache, get_response_key
 from .permissions import IsAdminOrReadOnly
 
+# Метка кеша в метрике yamdb_cache_requests_total.
+RESPONSE_CACHE = 'response'
+ETAG_PARTS = '{}.{}|{}|{}|{}'
+
+
+class CachedResponseMixin:
+    """Кеширует данные ответов list по полному URL запроса.
+
+    В ключ входят поколения моделей cache_models, которые увеличиваются при
+    каждом их изменении (api.signals), так что при попадании в кеш ответ
+    отдаётся без обращений к ORM и сериализаторам. Данные ответа не
+    зависят от пользователя, а права проверяются до обращения к кешу.
+    Другие действия кешируются вызовом get_cached_response(). Вместе с
+    ConditionalGetMixin, который должен следовать за этим классом, в кеш
+    попадает и версия данных.
+    """
+
+    cache_models = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        cache = get_response_cache()
+        if cache is None:
+            return handler(request, *args, **kwargs)
+
+        key = get_response_key(cache, self, request)
+        cached = cache.get(key)
+        CACHE_REQUESTS.inc(RESPONSE_CACHE, MISS if cached is None else HIT)
+        if cached is not None:
+            data, version = cached
+            if version is None:
+                return Response(data)
+            # Версия данных сохранена вместе с ними, поэтому ETag и ответ
+            # 304 отдаются тоже без обращений к базе.
+            return self.get_version_response(
+                version, lambda *args, **kwargs: Response(data),
+                request, *args, **kwargs
+            )
+
+        self.version = None
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(
+                key, (response.data, self.version),
+                settings.RESPONSE_CACHE_TTL
+            )
+        return response
+
+
+class ConditionalGetMixin:
+    """Условные GET-запросы для list и retrieve.
+
+    Ответ получает ETag, вычисленный из версии данных get_version(), и на
+    запрос с совпадающим If-None-Match возвращается 304 без сериализации.
+    Версия читается из базы одним запросом, а не из кеша: иначе процессы
+    с разными локальными кешами отвечали бы 304 на изменённые данные.
+    Она должна меняться при любом изменении данных ответа; None отключает
+    условную обработку запроса.
+    """
+
+    version_field = 'updated'
+
+    def list(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def get_version(self):
+        """Для retrieve - время изменения объекта, который затем отдаётся
+        без повторной выборки. Для list - число объектов и время последнего
+        изменения одним агрегатом по индексу, число переиспользует
+        пагинатор вместо своего COUNT(*). В курсорном режиме объекты не
+        считаются: версией служат строки выбранной страницы."""
+        if self.action == 'retrieve':
+            return (getattr(self.get_object(), self.version_field),)
+        if self.use_cursor():
+            return self.get_page_version()
+        stamp = self.filter_queryset(self.get_queryset()).aggregate(
+            count=Count('pk'), last_updated=Max(self.version_field)
+        )
+        self.object_count = stamp['count']
+        return stamp['count'], stamp['last_updated']
+
+    def use_cursor(self):
+        use_cursor = getattr(self.paginator, 'use_cursor', None)
+        return use_cursor is not None and use_cursor(self.request, self)
+
+    def get_page_version(self):
+        """Страница выбирается сразу и затем отдаётся без повторной выборки.
+        Ссылки на соседние страницы строятся по её крайним строкам и
+        курсору из URL, который входит в ETag, поэтому кроме строк в версию
+        входит только наличие соседних страниц."""
+        page = self.paginate_queryset(
+            self.filter_queryset(self.get_queryset())
+        )
+        cursor = self.paginator.cursor_paginator
+        return (
+            tuple((obj.pk, getattr(obj, self.version_field)) for obj in page),
+            cursor.has_next, cursor.has_previous
+        )
+
+    def get_object(self):
+        if not hasattr(self, '_object'):
+            self._object = super().get_object()
+        return self._object
+
+    def paginate_queryset(self, queryset):
+        if not hasattr(self, '_page'):
+            self._page = super().paginate_queryset(queryset)
+        return self._page
+
+    def get_conditional_response(self, handler, request, *args, **kwargs):
+        self.version = self.get_version()
+        if self.version is None:
+            return handler(request, *args, **kwargs)
+        return self.get_version_response(
+            self.version, handler, request, *args, **kwargs
+        )
+
+    def get_version_response(self, version, handler, request, *args,
+                             **kwargs):
+        """Ответ 304 на запрос с совпадающим ETag, иначе ответ handler.
+        В обоих случаях ответ получает ETag версии version."""
+        etag = self.get_etag(request, version)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        response['ETag'] = etag
+        return response
+
+    def get_etag(self, request, version) -> str:
+        """Сильный ETag: версия данных, полный путь запроса с параметрами
+        и выбранный формат ответа."""
+        digest = hashlib.md5(ETAG_PARTS.format(
+            type(self).__name__, self.action, version,
+            request.get_full_path(), request.accepted_media_type
+        ).encode('utf8')).hexdigest()
+        return f'"{digest}"'
+
 
 class CategoryGenreMixin(
-    GenericViewSet, CreateModelMixin, DestroyModelMixin, ListModelMixin
+    CachedResponseMixin, GenericViewSet, CreateModelMixin, DestroyModelMixin,
+    ListModelMixin
 ):
     permission_classes = (IsAdminOrReadOnly,)
     filter_backends = (filters.SearchFilter,)
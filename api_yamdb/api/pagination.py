@@ -0,0 +1,68 @@
+from functools import partial
+
+from django.core.paginator import Paginator
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CountedPaginator(Paginator):
+    """Paginator, которому число объектов может быть передано готовым."""
+
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        if count is not None:
+            self.count = count
+
+
+class PageNumberOrCursorPagination(PageNumberPagination):
+    """Постраничная пагинация с курсорным режимом по запросу.
+
+    Курсорный режим включается параметром ``?pagination=cursor`` либо
+    атрибутом ``cursor_pagination = True`` у вьюсета и строится по его
+    атрибуту ``ordering``. В этом режиме не выполняется COUNT(*), а страница
+    выбирается по индексу, без OFFSET. Если вьюсет уже посчитал объекты
+    (атрибут ``object_count``), COUNT(*) не выполняется и в постраничном
+    режиме.
+    """
+
+    mode_query_param = 'pagination'
+    cursor_mode = 'cursor'
+    page_mode = 'page'
+
+    def use_cursor(self, request, view):
+        mode = request.query_params.get(self.mode_query_param)
+        if mode == self.cursor_mode:
+            return True
+        if mode == self.page_mode:
+            return False
+        if CursorPagination.cursor_query_param in request.query_params:
+            return True
+        return getattr(view, 'cursor_pagination', False)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if view is None or not self.use_cursor(request, view):
+            self.django_paginator_class = partial(
+                CountedPaginator, count=getattr(view, 'object_count', None)
+            )
+            return super().paginate_queryset(queryset, request, view)
+
+        self.cursor_paginator = CursorPagination()
+        self.cursor_paginator.ordering = view.ordering
+        self.cursor_paginator.page_size = self.get_page_size(request)
+        page = self.cursor_paginator.paginate_queryset(
+            queryset, request, view
+        )
+        self.display_page_controls = (
+            self.cursor_paginator.display_page_controls
+        )
+        return page
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.to_html()
+        return super().to_html()
@@ -25,14 +25,22 @@ class IsAdminOrReadOnly(permissions.BasePermission):
 
 
 class IsAuthorModeratorAdmin(permissions.BasePermission):
-    """Разрешения для авторов, модераторов и администраторов"""
+    """Разрешения для авторов, модераторов и администраторов.
+
+    Автор сравнивается по author_id, без загрузки связанного пользователя;
+    решение для объекта кешируется на время запроса.
+    """
 
     def has_object_permission(self, request, view, obj):
-        if request.user.is_authenticated:
-            return (
-                obj.author == request.user
+        if not request.user.is_authenticated:
+            return request.method in permissions.SAFE_METHODS
+        decisions = request.__dict__.setdefault('_object_permissions', {})
+        key = (type(obj), obj.pk)
+        if key not in decisions:
+            decisions[key] = (
+                obj.author_id == request.user.pk
                 or request.user.is_superuser
                 or request.user.is_admin
                 or request.user.is_moderator
             )
-        return request.method in permissions.SAFE_METHODS
+        return decisions[key]
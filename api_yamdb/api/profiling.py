@@ -0,0 +1,164 @@
+import cProfile
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from rest_framework.views import APIView
+
+from .middleware import get_endpoint
+
+PROFILE_SUFFIX = '.prof'
+STACKS_SUFFIX = '.folded'
+MAX_STACK_DEPTH = 64
+UNSAFE_CHARS = re.compile(r'[^\w.-]')
+
+
+def short_path(filename: str) -> str:
+    """Путь к модулю относительно site-packages или каталога проекта."""
+    _, sep, tail = filename.rpartition('site-packages' + os.sep)
+    if sep:
+        return tail
+    base_dir = str(settings.BASE_DIR) + os.sep
+    return filename[len(base_dir):] if filename.startswith(
+        base_dir
+    ) else filename
+
+
+def get_stack(frame) -> str:
+    """Стек от корня к листу в свёрнутом формате flamegraph."""
+    frames = []
+    while frame is not None and len(frames) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        frames.append(f'{short_path(code.co_filename)}:{code.co_name}')
+        frame = frame.f_back
+    return ';'.join(reversed(frames))
+
+
+class StackSampler:
+    """Общий для процесса поток, снимающий стеки потоков, которые сейчас
+    обрабатывают запросы. Пока таких потоков нет, он только спит.
+
+    Поток получает GIL не чаще sys.getswitchinterval(), поэтому у коротких
+    запросов стеки смещены к вызовам, отпускающим GIL (обращения к базе).
+    """
+
+    def __init__(self):
+        self.active = {}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start(self, thread_id: int) -> Counter:
+        stacks = Counter()
+        with self.lock:
+            self.active[thread_id] = stacks
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self.run, name='stack-sampler', daemon=True
+                )
+                self.thread.start()
+        return stacks
+
+    def stop(self, thread_id: int) -> None:
+        with self.lock:
+            self.active.pop(thread_id, None)
+
+    def run(self) -> None:
+        while True:
+            time.sleep(settings.PROFILING_INTERVAL)
+            # Снимок делается под блокировкой, чтобы после stop() стеки
+            # запроса больше не менялись.
+            with self.lock:
+                if not self.active:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, stacks in self.active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stacks[get_stack(frame)] += 1
+
+
+sampler = StackSampler()
+
+
+def get_profile_path(endpoint: str, elapsed: float, suffix: str) -> Path:
+    directory = Path(settings.PROFILING_DIR, UNSAFE_CHARS.sub('_', endpoint))
+    directory.mkdir(parents=True, exist_ok=True)
+    moment = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+    return directory.joinpath(
+        f'{moment}-{elapsed * 1000:.0f}ms-{threading.get_ident()}{suffix}'
+    )
+
+
+def is_api_request(request) -> bool:
+    """Обработан ли запрос вьюсетом DRF; маршрут известен после обработки."""
+    match = request.resolver_match
+    view = getattr(match.func, 'cls', None) if match else None
+    return view is not None and issubclass(view, APIView)
+
+
+class ProfilingMiddleware:
+    """Профилирует обработку запроса вьюсетами DRF.
+
+    Доля запросов ``PROFILING_SAMPLE_RATE`` профилируется cProfile. Если
+    задан порог ``PROFILING_SLOW_THRESHOLD`` (секунды), у остальных запросов
+    снимаются стеки с интервалом ``PROFILING_INTERVAL``, и сохраняются
+    только стеки запросов, обработка которых заняла больше порога.
+    Профили складываются в ``PROFILING_DIR/<вьюсет.действие>/``;
+    сводку по ним печатает команда profile_hotspots.
+
+    Профилируется вызов get_response(), поэтому профилируемый запрос
+    обрабатывается как любой другой: с ATOMIC_REQUESTS, process_view и
+    process_exception других middleware и отрисовкой ответа. Маршрут
+    известен только после обработки, и профили запросов не к вьюсетам DRF
+    отбрасываются. Стоит последним в MIDDLEWARE, чтобы в профили не
+    попадали остальные middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() < settings.PROFILING_SAMPLE_RATE:
+            return self.profile(request)
+        if settings.PROFILING_SLOW_THRESHOLD is not None:
+            return self.sample(request)
+        return self.get_response(request)
+
+    def profile(self, request):
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            return self.get_response(request)
+        finally:
+            profiler.disable()
+            if is_api_request(request):
+                profiler.dump_stats(get_profile_path(
+                    get_endpoint(request), time.perf_counter() - started,
+                    PROFILE_SUFFIX
+                ))
+
+    def sample(self, request):
+        thread_id = threading.get_ident()
+        stacks = sampler.start(thread_id)
+        started = time.perf_counter()
+        try:
+            return self.get_response(request)
+        finally:
+            sampler.stop(thread_id)
+            elapsed = time.perf_counter() - started
+            if elapsed >= settings.PROFILING_SLOW_THRESHOLD and stacks and (
+                is_api_request(request)
+            ):
+                get_profile_path(
+                    get_endpoint(request), elapsed, STACKS_SUFFIX
+                ).write_text(''.join(
+                    f'{stack} {count}\n' for stack, count in stacks.items()
+                ))
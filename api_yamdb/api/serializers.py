@@ -2,7 +2,9 @@ from datetime import date
 
 from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import default_token_generator
-from rest_framework import serializers, status
+from django.db import transaction
+from django.db.models import Q
+from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from rest_framework.generics import get_object_or_404
 from rest_framework.validators import UniqueValidator
@@ -10,6 +12,7 @@ from rest_framework_simplejwt.serializers import TokenObtainSerializer
 from rest_framework_simplejwt.tokens import RefreshToken
 from reviews.models import Category, Comment, Genre, Review, Title
 from reviews.validators import PastOrPresentYearValidator
+from users.constants import TOKEN_ROLE_CLAIM, TOKEN_VERSION_CLAIM
 from users.validators import CustomUsernameValidator
 
 from .constants import MAX_LENGTH_CHAR, MAX_LENGTH_MAIL
@@ -34,78 +37,45 @@ class UserSignUpSerializer(serializers.Serializer):
     class Meta:
         fields = ('username', 'email')
 
+    @transaction.atomic
     def create(self, validated_data):
         email = validated_data.get('email')
         username = validated_data.get('username')
+        user = self.existing_user
 
-        existing_user_by_email = User.objects.filter(email=email).first()
-        existing_user_by_username = User.objects.filter(
-            username=username
-        ).first()
-
-        if existing_user_by_email and (existing_user_by_email.username
-                                       != username):
-            raise serializers.ValidationError(
-                {
-                    'email': [
-                        'User with this email already exists but with '
-                        'a different username.'
-                    ],
-                    'username': []  # Пустой массив для username
-                },
-                code=status.HTTP_400_BAD_REQUEST
-            )
-
-        if existing_user_by_username and (existing_user_by_username.email
-                                          != email):
-            raise serializers.ValidationError(
-                {
-                    'username': [
-                        'User with this username already exists but with '
-                        'a different email.'
-                    ],
-                    'email': []  # Пустой массив для email
-                },
-                code=status.HTTP_400_BAD_REQUEST
-            )
-
-        user = (
-            existing_user_by_email
-            or existing_user_by_username
-            or User.objects.create(
-                email=email, username=username
-            )
-        )
+        if user is None:
+            user = User(email=email, username=username)
+            user.confirmation_code = default_token_generator.make_token(user)
+            user.save(force_insert=True)
+        else:
+            user.confirmation_code = default_token_generator.make_token(user)
+            user.save(update_fields=('confirmation_code',))
 
-        confirmation_code = default_token_generator.make_token(user)
-        user.confirmation_code = confirmation_code
-        user.save()
-
-        send_confirmation_email(email, confirmation_code)
+        send_confirmation_email(email, user.confirmation_code)
         return user
 
     def validate(self, data):
+        """Проверка занятости логина и почты одним запросом.
+
+        Найденный пользователь с теми же логином и почтой сохраняется в
+        existing_user и переиспользуется в create().
+        """
         errors = {}
         username = data.get('username')
         email = data.get('email')
-
-        if username:
-            existing_user_by_username = User.objects.filter(
-                username=username
-            ).first()
-            if existing_user_by_username and (existing_user_by_username.email
-                                              != email):
+        self.existing_user = None
+
+        for user in User.objects.filter(
+            Q(username=username) | Q(email=email)
+        )[:2]:
+            if user.username == username and user.email == email:
+                self.existing_user = user
+            elif user.username == username:
                 errors['username'] = [
                     'User with this username already exists but with '
                     'a different email.'
                 ]
-
-        if email:
-            existing_user_by_email = User.objects.filter(
-                email=email
-            ).first()
-            if existing_user_by_email and (existing_user_by_email.username
-                                           != username):
+            else:
                 errors['email'] = [
                     'User with this email already exists but with '
                     'a different username.'
@@ -128,8 +98,12 @@ class CustomTokenObtainSerializer(TokenObtainSerializer):
 
     @classmethod
     def get_token(cls, user):
-        token = super().get_token(user)
+        token = RefreshToken.for_user(user)
         token['username'] = user.username
+        token[TOKEN_ROLE_CLAIM] = user.role
+        token['is_staff'] = user.is_staff
+        token['is_superuser'] = user.is_superuser
+        token[TOKEN_VERSION_CLAIM] = user.token_version
         return token
 
     def validate(self, attrs):
@@ -140,12 +114,13 @@ class CustomTokenObtainSerializer(TokenObtainSerializer):
 
         if user.confirmation_code != confirmation_code:
             confirmation_code = default_token_generator.make_token(user)
-            user.confirmation_code = confirmation_code
-            user.save()
-            send_confirmation_email(user.email, confirmation_code)
+            with transaction.atomic():
+                user.confirmation_code = confirmation_code
+                user.save()
+                send_confirmation_email(user.email, confirmation_code)
             raise ValidationError('Неправильный код подтверждения')
 
-        token = RefreshToken.for_user(user)
+        token = self.get_token(user)
         return {'token': str(token.access_token)}
 
 
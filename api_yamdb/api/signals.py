@@ -0,0 +1,84 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_migrate,
+                                      post_save, pre_delete)
+from django.dispatch import receiver
+from django.utils import timezone
+from reviews.models import Category, Comment, Genre, Review, Title
+
+from .cache import bump_generations
+
+User = get_user_model()
+
+CACHED_MODELS = (Category, Genre, Review, Title)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Genre)
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=Title)
+def bump_model_generation(sender, **kwargs):
+    # После фиксации транзакции: иначе параллельный запрос может успеть
+    # закешировать ещё старые данные под новым поколением.
+    transaction.on_commit(partial(bump_generations, sender))
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def bump_title_generation(sender, action, **kwargs):
+    if action.startswith('post_'):
+        transaction.on_commit(partial(bump_generations, Title))
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def touch_genre_titles(sender, instance, action, reverse, pk_set, **kwargs):
+    """Жанры выводятся в произведениях: при изменении связей обновляется
+    время изменения произведений, а с ним и ETag ответов. Связи жанра
+    очищаются без pk_set, поэтому его произведения выбираются до этого."""
+    if reverse and action == 'pre_clear':
+        Title.touch(Title.objects.filter(genre=instance))
+    elif action in ('post_add', 'post_remove') and pk_set:
+        Title.touch(Title.objects.filter(
+            pk__in=pk_set if reverse else (instance.pk,)
+        ))
+    elif not reverse and action == 'post_clear':
+        Title.touch(Title.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Genre)
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=Genre)
+def touch_classified_titles(sender, instance, created=False, **kwargs):
+    """Категория и жанры выводятся в произведениях: при их изменении или
+    удалении обновляется время изменения их произведений. Удаление
+    обнуляет категорию и удаляет связи с жанром без сигналов, поэтому
+    произведения обновляются до него."""
+    if not created:
+        Title.touch(Title.objects.filter(
+            **{sender._meta.model_name: instance}
+        ))
+
+
+@receiver(post_save, sender=User)
+def touch_authored(sender, instance, created, **kwargs):
+    """Имя автора выводится в отзывах и комментариях: при его смене
+    обновляется их время изменения, а с ним и ETag ответов."""
+    loaded = getattr(instance, '_loaded_username', None)
+    if created or loaded in (None, instance.username):
+        return
+    now = timezone.now()
+    for model in (Review, Comment):
+        model.objects.filter(author=instance).update(updated=now)
+
+
+@receiver(post_migrate)
+def bump_all_generations(sender, **kwargs):
+    """migrate и flush меняют данные без сигналов моделей."""
+    if sender.label == Title._meta.app_label:
+        bump_generations(*CACHED_MODELS)
@@ -1,13 +1,26 @@
 from django.conf import settings
 from django.core.mail import send_mail
+from django.db import transaction
+from users.models import EmailOutbox
 
 
 def send_confirmation_email(email, confirmation_code):
-    """Отправка сообщений с кодом подтверждения на почту."""
+    """Отправка сообщений с кодом подтверждения на почту.
 
-    send_mail(
-        subject='YaMDb Confirmation Code',
-        message=f'Ваш проверочный код: {confirmation_code}',
-        from_email=settings.EMAIL_SENDER,
-        recipient_list=[email]
+    При включённой настройке EMAIL_USE_OUTBOX письмо только ставится в
+    очередь в текущей транзакции, а отправляет его команда send_emails.
+    Без очереди письмо отправляется после фиксации транзакции, чтобы
+    SMTP-запрос не держал блокировку записи.
+    """
+
+    message = {
+        'subject': 'YaMDb Confirmation Code',
+        'message': f'Ваш проверочный код: {confirmation_code}',
+        'from_email': settings.EMAIL_SENDER,
+    }
+    if settings.EMAIL_USE_OUTBOX:
+        EmailOutbox.objects.create(recipient=email, **message)
+        return
+    transaction.on_commit(
+        lambda: send_mail(recipient_list=[email], **message)
     )
@@ -1,5 +1,5 @@
 from django.contrib.auth import get_user_model
-from django.db.models import Avg
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
@@ -14,8 +14,11 @@ from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView
 from reviews.models import Category, Genre, Review, Title
 
+from .facets import Facets
 from .filters import TitleFilter
-from .mixins import CategoryGenreMixin
+from .mixins import (CachedResponseMixin, CategoryGenreMixin,
+                     ConditionalGetMixin)
+from .pagination import PageNumberOrCursorPagination
 from .permissions import IsAdmin, IsAdminOrReadOnly, IsAuthorModeratorAdmin
 from .serializers import (CategorySerializer, CommentSerializer,
                           CustomTokenObtainSerializer, GenreSerializer,
@@ -67,14 +70,16 @@ class UserViewSet(viewsets.ModelViewSet):
         serializer_class=UserSerializer
     )
     def me(self, request):
+        # request.user загружен из кеша аутентификации не полностью.
+        user = User.objects.get(pk=request.user.pk)
         serializer = UserSerializer(
-            request.user,
+            user,
             data=request.data,
             partial=True
         )
 
         serializer.is_valid(raise_exception=True)
-        serializer.save(role=request.user.role)
+        serializer.save(role=user.role)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -82,34 +87,36 @@ class CategoryViewSet(CategoryGenreMixin):
 
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    cache_models = (Category,)
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
 
     serializer_class = CommentSerializer
-    pagination_class = PageNumberPagination
+    pagination_class = PageNumberOrCursorPagination
+    ordering = '-pub_date'
     permission_classes = (IsAuthenticatedOrReadOnly, IsAuthorModeratorAdmin,)
     http_method_names = ('get', 'post', 'patch', 'delete')
 
     def get_queryset(self):
-        return self.get_item().comments.all()
+        return self.get_item().comments.select_related('author')
 
     def get_item(self):
-        title_object = get_object_or_404(
-            Title,
-            id=self.kwargs.get('title_id')
-        )
-        review_object = get_object_or_404(
-            Review,
-            id=self.kwargs.get('review_id'),
-            title=title_object
-        )
-        return review_object
+        """Отзыв из URL, найденный одним запросом и закешированный на время
+        обработки запроса."""
+        if not hasattr(self, '_review'):
+            self._review = get_object_or_404(
+                Review,
+                id=self.kwargs.get('review_id'),
+                title_id=self.kwargs.get('title_id')
+            )
+        return self._review
 
     def perform_create(self, serializer):
         review = self.get_item()
-        title = review.title
-        serializer.save(author=self.request.user, review=review, title=title)
+        serializer.save(
+            author=self.request.user, review=review, title_id=review.title_id
+        )
 
 
 class GenreViewSet(CategoryGenreMixin):
@@ -117,32 +124,64 @@ class GenreViewSet(CategoryGenreMixin):
 
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
+    cache_models = (Genre,)
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """ViewSet для управления отзывами."""
 
-    queryset = Review.objects.all()
     serializer_class = ReviewSerializer
+    pagination_class = PageNumberOrCursorPagination
+    ordering = '-pub_date'
     permission_classes = (IsAuthenticatedOrReadOnly, IsAuthorModeratorAdmin)
     http_method_names = ('get', 'post', 'patch', 'delete')
 
+    def get_queryset(self):
+        return Review.objects.filter(
+            title_id=self.kwargs.get('title_id')
+        ).select_related('author')
+
+    @transaction.atomic
     def perform_create(self, serializer):
         title_object = get_object_or_404(Title, id=self.kwargs.get('title_id'))
         serializer.save(author=self.request.user, title=title_object)
 
+    @transaction.atomic
+    def perform_update(self, serializer):
+        # Рейтинг произведения сдвигают сигналы отзыва, в транзакции старая
+        # оценка читается с блокировкой строки.
+        serializer.save()
 
-class TitleViewSet(viewsets.ModelViewSet):
-    """ViewSet для управления произведениями."""
 
-    queryset = Title.objects.annotate(
-        rating=Avg('reviews__score')
-    ).order_by('name')
-    pagination_class = PageNumberPagination
+class TitleViewSet(CachedResponseMixin, ConditionalGetMixin,
+                   viewsets.ModelViewSet):
+    """ViewSet для управления произведениями.
+
+    Категории и жанры в ETag не входят отдельно: их изменения обновляют
+    время изменения произведений (api.signals).
+    """
+
+    queryset = Title.objects.select_related(
+        'category'
+    ).prefetch_related('genre').order_by('name')
+    pagination_class = PageNumberOrCursorPagination
+    ordering = 'name'
     filter_backends = (DjangoFilterBackend,)
     filterset_class = TitleFilter
     permission_classes = (IsAdminOrReadOnly,)
     http_method_names = ('get', 'post', 'patch', 'delete')
+    cache_models = (Title, Category, Genre, Review)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    @action(detail=False, methods=('get',))
+    def facets(self, request):
+        """Число произведений по жанрам, категориям и десятилетиям для
+        тех же параметров фильтрации, что и у списка."""
+        return Response(Facets(self.filterset_class, request).get())
 
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
@@ -0,0 +1,250 @@
+"""Метрики процесса в текстовом формате Prometheus.
+
+Каждый поток пишет в собственные счётчики, поэтому запись не берёт
+блокировок; при выгрузке счётчики всех потоков складываются. Счётчики
+завершившегося потока прибавляются к общему итогу метрики, чтобы их
+число не росло вместе с числом созданных потоков.
+"""
+import hmac
+import threading
+import weakref
+from bisect import bisect_left
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+DB_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+HIT = 'hit'
+MISS = 'miss'
+
+
+def format_labels(names: tuple, values: tuple, extra: str = '') -> str:
+    pairs = [
+        '{}="{}"'.format(name, str(value).replace('\\', r'\\').replace(
+            '"', r'\"'
+        ).replace('\n', r'\n'))
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def format_value(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Метрика с набором меток и данными, разложенными по потокам."""
+
+    type = ''
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._local = threading.local()
+        self._shards = {}
+        self._total = {}
+        self._lock = threading.Lock()
+
+    def shard(self) -> dict:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards[id(shard)] = shard
+            weakref.finalize(threading.current_thread(), self.fold, shard)
+        return shard
+
+    def fold(self, shard: dict) -> None:
+        """Переносит счётчики завершившегося потока в общий итог."""
+        with self._lock:
+            del self._shards[id(shard)]
+            for labels, series in shard.items():
+                self.merge(self._total, labels, series)
+
+    def merged(self) -> dict:
+        merged = {}
+        # Итог и список потоков читаются под одной блокировкой, чтобы
+        # счётчики потока, перенесённые в итог, не попали в сумму дважды.
+        with self._lock:
+            shards = list(self._shards.values())
+            for labels, series in self._total.items():
+                self.merge(merged, labels, series)
+        for shard in shards:
+            for labels, series in shard.copy().items():
+                self.merge(merged, labels, series)
+        return merged
+
+    def render(self) -> list:
+        return [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.type}',
+        ] + self.samples()
+
+
+class Counter(Metric):
+
+    type = 'counter'
+
+    def inc(self, *labels, amount=1) -> None:
+        shard = self.shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def merge(self, merged: dict, labels: tuple, value) -> None:
+        merged[labels] = merged.get(labels, 0) + value
+
+    def value(self, *labels):
+        return self.merged().get(labels, 0)
+
+    def samples(self) -> list:
+        return [
+            f'{self.name}{format_labels(self.labels, labels)} '
+            f'{format_value(value)}'
+            for labels, value in sorted(self.merged().items())
+        ]
+
+
+class Histogram(Metric):
+    """Гистограмма; ряд хранит число значений в каждой корзине, затем
+    число значений выше последней границы и сумму."""
+
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: tuple = (),
+                 buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels) -> None:
+        shard = self.shard()
+        series = shard.get(labels)
+        if series is None:
+            series = shard[labels] = [0] * (len(self.buckets) + 1) + [0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def merge(self, merged: dict, labels: tuple, series: list) -> None:
+        total = merged.get(labels)
+        if total is None:
+            merged[labels] = list(series)
+            return
+        for index, value in enumerate(series):
+            total[index] += value
+
+    def samples(self) -> list:
+        lines = []
+        bounds = [format_value(bound) for bound in self.buckets] + ['+Inf']
+        for labels, series in sorted(self.merged().items()):
+            cumulative = 0
+            for bound, count in zip(bounds, series):
+                cumulative += count
+                bucket_labels = format_labels(
+                    self.labels, labels, f'le="{bound}"'
+                )
+                lines.append(
+                    f'{self.name}_bucket{bucket_labels} {cumulative}'
+                )
+            lines.append(
+                f'{self.name}_sum{format_labels(self.labels, labels)} '
+                f'{format_value(series[-1])}'
+            )
+            lines.append(
+                f'{self.name}_count{format_labels(self.labels, labels)} '
+                f'{cumulative}'
+            )
+        return lines
+
+
+class Gauge(Metric):
+    """Значение, которое вычисляется при каждой выгрузке."""
+
+    type = 'gauge'
+
+    def __init__(self, name: str, documentation: str, callback):
+        super().__init__(name, documentation)
+        self.callback = callback
+
+    def samples(self) -> list:
+        return [f'{self.name} {format_value(self.callback())}']
+
+
+class Registry:
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return '\n'.join(
+            line for metric in self.metrics for line in metric.render()
+        ) + '\n'
+
+
+def count_pending_emails() -> int:
+    from users.constants import EMAIL_OUTBOX_MAX_ATTEMPTS
+    from users.models import EmailOutbox
+
+    return EmailOutbox.objects.filter(
+        sent_at__isnull=True, attempts__lt=EMAIL_OUTBOX_MAX_ATTEMPTS
+    ).count()
+
+
+registry = Registry()
+
+REQUEST_DURATION = registry.register(Histogram(
+    'yamdb_request_duration_seconds',
+    'Time spent handling a request.',
+    ('endpoint', 'method'),
+))
+RESPONSES = registry.register(Counter(
+    'yamdb_responses_total',
+    'Responses by endpoint and status code.',
+    ('endpoint', 'status'),
+))
+REQUEST_QUERIES = registry.register(Histogram(
+    'yamdb_request_db_queries',
+    'SQL queries made while handling a request.',
+    ('endpoint',),
+    QUERY_BUCKETS,
+))
+REQUEST_DB_DURATION = registry.register(Histogram(
+    'yamdb_request_db_duration_seconds',
+    'Time spent in SQL queries while handling a request.',
+    ('endpoint',),
+    DB_LATENCY_BUCKETS,
+))
+CACHE_REQUESTS = registry.register(Counter(
+    'yamdb_cache_requests_total',
+    'Cache lookups by cache and result (hit or miss).',
+    ('cache', 'result'),
+))
+registry.register(Gauge(
+    'yamdb_email_outbox_pending',
+    'Emails waiting in the outbox.',
+    count_pending_emails,
+))
+
+
+def metrics(request):
+    """Отдаёт метрики, только если METRICS_ENABLED; при заданном
+    METRICS_TOKEN запрос должен передать его в заголовке
+    ``Authorization: Bearer <токен>``."""
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    token = settings.METRICS_TOKEN
+    if token is not None and not hmac.compare_digest(
+        request.headers.get('Authorization', '').encode(),
+        f'Bearer {token}'.encode()
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
@@ -30,6 +30,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -37,6 +38,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'api_yamdb.urls'
@@ -112,7 +114,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ],
 
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
@@ -130,5 +132,62 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
 DOMAIN_NAME = 'yandex.ru'
 EMAIL_SENDER = f'yambd@{DOMAIN_NAME}'
+# Письма ставятся в очередь и отправляются командой send_emails.
+EMAIL_USE_OUTBOX = True
 
 AUTH_USER_MODEL = 'users.CustomUser'
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+# Кеш ответов api.mixins.CachedResponseMixin: имя кеша из CACHES (None -
+# кеш выключен) и время жизни ответа в секундах. Кеш должен быть общим для
+# всех процессов сервера (Redis, Memcached): запись сбрасывает поколения
+# только в своём кеше, и с locmem остальные процессы отдавали бы старые
+# ответы до RESPONSE_CACHE_TTL.
+RESPONSE_CACHE = None
+RESPONSE_CACHE_TTL = 300
+
+# Полнотекстовый поиск произведений (reviews.search): 'fts5' или 'memory';
+# None - FTS5, если он доступен.
+TITLE_SEARCH_BACKEND = None
+
+# Кеш пользователей для users.authentication.CachedJWTAuthentication.
+AUTH_USER_CACHE_SIZE = 1024
+AUTH_USER_CACHE_TTL = 60
+# Имя кеша из CACHES, общего для всех процессов; None - только локальный.
+AUTH_USER_SHARED_CACHE = None
+# Запросы на чтение получают пользователя из утверждений токена, не загружая
+# его из базы данных, пока известна версия его токенов. Без
+# AUTH_USER_SHARED_CACHE другие процессы сервера узнают об отзыве токенов
+# только через AUTH_USER_CACHE_TTL.
+AUTH_TOKEN_USER = False
+
+# Бюджеты SQL-запросов для api.middleware.QueryInstrumentationMiddleware:
+# ключ - вьюсет или вьюсет.действие.
+SQL_QUERY_BUDGETS = {
+    'TitleViewSet.list': 4,
+    'TitleViewSet.retrieve': 3,
+    'ReviewViewSet.list': 4,
+    'ReviewViewSet.retrieve': 3,
+    'CommentViewSet.list': 4,
+    'CommentViewSet.retrieve': 3,
+}
+SQL_QUERY_BUDGET_RAISE = False
+
+# Эндпоинт /metrics/ для Prometheus: выключен по умолчанию, так как
+# раскрывает внутренние маршруты и задержки. Если задан токен, сборщик
+# метрик передаёт его в заголовке Authorization: Bearer <токен>.
+METRICS_ENABLED = False
+METRICS_TOKEN = None
+
+# Профилирование api.profiling.ProfilingMiddleware: доля запросов под
+# cProfile и порог в секундах, после которого сохраняются снятые стеки.
+PROFILING_SAMPLE_RATE = 0
+PROFILING_SLOW_THRESHOLD = None
+PROFILING_INTERVAL = 0.005
+PROFILING_DIR = BASE_DIR / 'profiles'
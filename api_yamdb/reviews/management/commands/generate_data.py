@@ -0,0 +1,290 @@
+import csv
+import random
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from pathlib import Path
+from typing import Optional
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from reviews.models import User
+
+from .populate_db import ModelFileMatch
+
+SEED = 42
+TITLES = 1000
+REVIEWS = 20000
+COMMENTS = 40000
+USERS = 2000
+CATEGORIES = 10
+GENRES = 30
+ZIPF_EXPONENT = 1.1
+PARETO_SHAPE = 1.5
+MAX_GENRES_PER_TITLE = 3
+# Названия произведений составляются из слов словаря с частотами по Ципфу,
+# чтобы на данных можно было проверять полнотекстовый поиск.
+TITLE_WORDS = 5000
+MAX_WORDS_PER_TITLE = 4
+SYLLABLES = (
+    'ба', 'ве', 'ги', 'до', 'жу', 'за', 'ки', 'ло', 'ма', 'не', 'ор', 'пе',
+    'ра', 'со', 'ту', 'фа', 'хо', 'це', 'ша', 'ян',
+)
+# Годы выпуска не зависят от текущей даты: иначе при том же seed данные
+# менялись бы с наступлением нового года.
+FIRST_YEAR = 1900
+LAST_YEAR = 2024
+FIRST_PUB_DATE = datetime(2015, 1, 1, tzinfo=timezone.utc)
+PUB_DATE_SPAN = timedelta(days=3650)
+# Оценки смещены к высоким, как в реальных каталогах.
+SCORE_WEIGHTS = (1, 1, 2, 2, 4, 6, 9, 12, 10, 7)
+ROLE_WEIGHTS = {
+    User.Role.USER: 97,
+    User.Role.MODERATOR: 2,
+    User.Role.ADMIN: 1,
+}
+
+
+def zipf_counts(
+    total: int, size: int, exponent: float, cap: Optional[int] = None
+) -> list:
+    """Делит total между size элементами по закону Ципфа.
+
+    Доли округляются методом наибольшего остатка, поэтому сумма равна
+    total. Элементы, доля которых больше cap, получают cap, а излишек
+    делится между следующими по рангу элементами.
+    """
+    weights = [1 / rank ** exponent for rank in range(1, size + 1)]
+    norm = sum(weights)
+    counts = []
+    # Веса убывают: ограничение касается только первых элементов.
+    while (
+        cap is not None and len(counts) < size
+        and total * weights[len(counts)] >= cap * norm
+    ):
+        counts.append(cap)
+        total -= cap
+        norm -= weights[len(counts) - 1]
+    shares = [total * weight / norm for weight in weights[len(counts):]]
+    rest = [int(share) for share in shares]
+    by_remainder = sorted(
+        range(len(shares)), key=lambda index: rest[index] - shares[index]
+    )
+    for index in by_remainder[:total - sum(rest)]:
+        rest[index] += 1
+    return counts + rest
+
+
+class Command(BaseCommand):
+
+    help = '''Generates a Deterministic Synthetic Catalogue as csv-Files
+Consumable by populate_db, with Zipf-Distributed Reviews per Title and
+Comments per Review'''
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('output', type=Path, help='Output Directory')
+        parser.add_argument('--seed', type=int, default=SEED)
+        parser.add_argument('--titles', type=int, default=TITLES)
+        parser.add_argument('--reviews', type=int, default=REVIEWS)
+        parser.add_argument('--comments', type=int, default=COMMENTS)
+        parser.add_argument('--users', type=int, default=USERS)
+        parser.add_argument('--categories', type=int, default=CATEGORIES)
+        parser.add_argument('--genres', type=int, default=GENRES)
+        parser.add_argument(
+            '--zipf-exponent', type=float, default=ZIPF_EXPONENT
+        )
+        parser.add_argument(
+            '--load',
+            action='store_true',
+            help='Run populate_db on the Generated Files Afterwards',
+        )
+
+    def handle(self, *args, **options) -> None:
+        for option in ('titles', 'users', 'categories', 'genres'):
+            if options[option] < 1:
+                raise CommandError(f'--{option} Must Be Positive')
+        for option in ('reviews', 'comments'):
+            if options[option] < 0:
+                raise CommandError(f'--{option} Must Not Be Negative')
+        if options['reviews'] > options['titles'] * options['users']:
+            raise CommandError(
+                '--reviews Must Not Exceed --titles Times --users: '
+                'a User Reviews a Title Once'
+            )
+        if options['comments'] and not options['reviews']:
+            raise CommandError('--comments Require --reviews')
+        self.rng = random.Random(options['seed'])
+        self.output = options['output']
+        self.output.mkdir(parents=True, exist_ok=True)
+
+        self.write_named(
+            ModelFileMatch.CATEGORY, 'category', options['categories']
+        )
+        self.write_named(ModelFileMatch.GENRE, 'genre', options['genres'])
+        self.write_users(options['users'])
+        self.write_titles(
+            options['titles'], options['categories'], options['genres']
+        )
+        reviews = self.write_reviews(
+            options['titles'], options['reviews'], options['users'],
+            options['zipf_exponent']
+        )
+        comments = self.write_comments(
+            reviews, options['comments'], options['users']
+        )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Generated {options["titles"]} Titles, {reviews} Reviews, '
+                f'{comments} Comments and {options["users"]} Users '
+                f'in {self.output}'
+            )
+        )
+        if options['load']:
+            call_command('populate_db', path=self.output, stdout=self.stdout)
+
+    def open_csv(self, match: ModelFileMatch, header: tuple):
+        file = open(
+            self.output.joinpath(match.value), 'w', encoding='utf8',
+            newline=''
+        )
+        writer = csv.writer(file)
+        writer.writerow(header)
+        return file, writer
+
+    def pub_date(self) -> str:
+        moment = FIRST_PUB_DATE + PUB_DATE_SPAN * self.rng.random()
+        return moment.isoformat(timespec='milliseconds').replace(
+            '+00:00', 'Z'
+        )
+
+    def write_named(self, match: ModelFileMatch, prefix: str, count: int):
+        file, writer = self.open_csv(match, ('id', 'name', 'slug'))
+        with file:
+            for pk in range(1, count + 1):
+                writer.writerow(
+                    (pk, f'{prefix.title()} {pk}', f'{prefix}-{pk}')
+                )
+
+    def write_users(self, count: int) -> None:
+        file, writer = self.open_csv(
+            ModelFileMatch.USER,
+            ('id', 'username', 'email', 'role', 'bio', 'first_name',
+             'last_name')
+        )
+        roles = self.rng.choices(
+            list(ROLE_WEIGHTS), weights=ROLE_WEIGHTS.values(), k=count
+        )
+        with file:
+            for pk, role in enumerate(roles, 1):
+                writer.writerow(
+                    (pk, f'user{pk}', f'user{pk}@yamdb.fake', role, '', '',
+                     '')
+                )
+
+    def make_words(self, count: int) -> list:
+        words = set()
+        while len(words) < count:
+            words.add(''.join(self.rng.choices(
+                SYLLABLES, k=self.rng.randint(2, 4)
+            )))
+        words = sorted(words)
+        self.rng.shuffle(words)
+        return words
+
+    def write_titles(self, count: int, categories: int, genres: int):
+        titles_file, titles = self.open_csv(
+            ModelFileMatch.TITLE, ('id', 'name', 'year', 'category')
+        )
+        links_file, links = self.open_csv(
+            ModelFileMatch.GENRE_TITLE, ('id', 'title_id', 'genre_id')
+        )
+        words = self.make_words(TITLE_WORDS)
+        word_weights = list(accumulate(
+            1 / rank ** ZIPF_EXPONENT for rank in range(1, len(words) + 1)
+        ))
+        link_id = 0
+        with titles_file, links_file:
+            for pk in range(1, count + 1):
+                name = ' '.join(self.rng.choices(
+                    words, cum_weights=word_weights,
+                    k=self.rng.randint(1, MAX_WORDS_PER_TITLE)
+                ))
+                titles.writerow((
+                    pk,
+                    name.capitalize(),
+                    self.rng.randint(FIRST_YEAR, LAST_YEAR),
+                    self.rng.randint(1, categories),
+                ))
+                for genre in self.rng.sample(
+                    range(1, genres + 1),
+                    self.rng.randint(1, min(MAX_GENRES_PER_TITLE, genres))
+                ):
+                    link_id += 1
+                    links.writerow((link_id, pk, genre))
+
+    def write_reviews(
+        self, titles: int, total: int, users: int, exponent: float
+    ) -> int:
+        """Пишет отзывы; на каждое произведение не больше одного отзыва от
+        пользователя, поэтому популярные произведения ограничены числом
+        пользователей, а их излишек достаётся следующим по популярности."""
+        ranked_titles = list(range(1, titles + 1))
+        self.rng.shuffle(ranked_titles)
+        file, writer = self.open_csv(
+            ModelFileMatch.REVIEW,
+            ('id', 'title_id', 'text', 'author', 'score', 'pub_date')
+        )
+        pk = 0
+        with file:
+            for title, count in zip(
+                ranked_titles, zipf_counts(total, titles, exponent, users)
+            ):
+                for author in self.rng.sample(range(1, users + 1), count):
+                    pk += 1
+                    writer.writerow((
+                        pk,
+                        title,
+                        f'Review {pk} of title {title}',
+                        author,
+                        self.rng.choices(
+                            range(1, 11), weights=SCORE_WEIGHTS
+                        )[0],
+                        self.pub_date(),
+                    ))
+        return pk
+
+    def write_comments(self, reviews: int, total: int, users: int) -> int:
+        """Пишет ровно total комментариев; их число у отзыва распределено
+        по Парето, что даёт тот же тяжёлый хвост, что и у распределения
+        Ципфа. Веса отзывов не хранятся: первый проход считает их сумму,
+        второй повторяет те же выборки и округляет нарастающий итог."""
+        file, writer = self.open_csv(
+            ModelFileMatch.COMMENT,
+            ('id', 'review_id', 'text', 'author', 'pub_date')
+        )
+        weights_seed = self.rng.getrandbits(64)
+        weights = random.Random(weights_seed)
+        norm = sum(
+            weights.paretovariate(PARETO_SHAPE) - 1 for _ in range(reviews)
+        )
+        weights.seed(weights_seed)
+        share = 0
+        pk = 0
+        with file:
+            for review in range(1, reviews + 1):
+                share += (
+                    (weights.paretovariate(PARETO_SHAPE) - 1) * total / norm
+                )
+                # Последний отзыв забирает ошибку округления.
+                last_pk = total if review == reviews else int(share + 0.5)
+                while pk < last_pk:
+                    pk += 1
+                    writer.writerow((
+                        pk,
+                        review,
+                        f'Comment {pk} on review {review}',
+                        self.rng.randint(1, users),
+                        self.pub_date(),
+                    ))
+        return pk
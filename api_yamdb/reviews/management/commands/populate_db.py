@@ -8,18 +8,36 @@ Created on Thu Aug 22 22:33:13 2024
 
 
 import csv
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from enum import Enum
+from functools import partial
+from itertools import islice
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Iterator, Optional
 
-from django.core.management.base import BaseCommand
+from api.cache import bump_generations
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
 from django.db.models.base import ModelBase
+from users.authentication import (invalidate_user_record,
+                                  set_token_version)
+from users.constants import ACCESS_FIELDS
 
 from reviews.models import Category, Comment, Genre, Review, Title, User
 
 DB_NAME = 'db.sqlite3'
 PATH_DATA = 'static/data'
 PATH = Path(__file__).resolve().parent.parent.parent.parent.joinpath(PATH_DATA)
+BATCH_SIZE = 1000
+WORKERS = 1
+# Базы, которые не выдерживают параллельной записи: каждый поток держит
+# транзакцию на всю загрузку файла, и остальные получают «database is
+# locked» по истечении таймаута ожидания.
+SERIAL_VENDORS = ('sqlite',)
 
 
 class ModelFileMatch(str, Enum):
@@ -37,6 +55,7 @@ class ModelFileMatch(str, Enum):
     GENRE = 'genre.csv', Genre, None
     USER = 'users.csv', User, None
     TITLE = 'titles.csv', Title, ('id', 'name', 'year', 'category_id')
+    GENRE_TITLE = 'genre_title.csv', Title.genre.through, None
     REVIEW = 'review.csv', Review, (
         'id', 'title_id', 'text', 'author_id', 'score', 'pub_date'
     )
@@ -45,29 +64,322 @@ class ModelFileMatch(str, Enum):
     )
 
 
+def build_stages(matches: Iterable[ModelFileMatch]) -> list:
+    """Разбивает файлы на этапы по внешним ключам моделей.
+
+    Файлы одного этапа не ссылаются друг на друга и могут загружаться
+    параллельно; каждый этап ссылается только на предыдущие.
+    """
+    by_model = {match.model: match for match in matches}
+    dependencies = {
+        model: {
+            field.related_model
+            for field in model._meta.concrete_fields
+            if field.is_relation
+            and field.related_model in by_model
+            and field.related_model is not model
+        }
+        for model in by_model
+    }
+    stages = []
+    loaded = set()
+    while dependencies:
+        stage = [
+            model for model, required in dependencies.items()
+            if required <= loaded
+        ]
+        if not stage:
+            raise CommandError(
+                'Circular Foreign Keys between '
+                + ', '.join(by_model[model].value for model in dependencies)
+            )
+        for model in stage:
+            del dependencies[model]
+        loaded.update(stage)
+        stages.append([by_model[model] for model in stage])
+    return stages
+
+
+def get_columns(match: ModelFileMatch, path: Path = PATH) -> tuple:
+    """Колонки csv-файла: заданные в ModelFileMatch или из заголовка."""
+    if match.fieldnames:
+        return match.fieldnames
+    with open(Path(path).joinpath(match.value), encoding='utf8') as file:
+        return tuple(next(csv.reader(file)))
+
+
+def get_upsert_fields(match: ModelFileMatch, path: Path = PATH) -> list:
+    """Поля, сравниваемые и обновляемые при слиянии."""
+    columns = set(get_columns(match, path))
+    return [
+        field for field in match.model._meta.concrete_fields
+        if field.attname in columns and not field.primary_key
+    ]
+
+
+@contextmanager
+def keep_dates(match: ModelFileMatch, path: Path = PATH):
+    """Сохраняет даты из csv-файла в полях auto_now и auto_now_add.
+
+    bulk_create() и bulk_update() заменяют значения таких полей текущим
+    временем, поэтому на время загрузки файла флаги снимаются. Каждую
+    модель загружает один поток, так что другие загрузки это не задевает.
+    """
+    columns = set(get_columns(match, path))
+    fields = [
+        (field, field.auto_now, field.auto_now_add)
+        for field in match.model._meta.concrete_fields
+        if field.attname in columns and hasattr(field, 'auto_now_add')
+    ]
+    for field, _, _ in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in fields:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def read_batches(
+    match: ModelFileMatch, batch_size: int, path: Path = PATH
+) -> Iterator[list]:
+    """Читает csv-файл пачками модельных объектов, не загружая его целиком."""
+    with open(Path(path).joinpath(match.value), encoding='utf8') as file:
+        reader = csv.DictReader(file, fieldnames=match.fieldnames)
+        if match.fieldnames:
+            next(reader)
+        rows = (match.model(**row) for row in reader)
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                return
+            yield batch
+
+
+def split_batch(batch: list, existing: dict, fields: list) -> tuple:
+    """Делит пачку на новые объекты и объекты, у которых изменилось
+    хотя бы одно из полей fields."""
+    created, changed = [], []
+    for obj in batch:
+        for field in fields:
+            setattr(obj, field.attname, field.to_python(
+                getattr(obj, field.attname)
+            ))
+        current = existing.get(obj.pk)
+        if current is None:
+            created.append(obj)
+        elif any(
+            getattr(obj, field.attname) != getattr(current, field.attname)
+            for field in fields
+        ):
+            changed.append(obj)
+    return created, changed
+
+
 class Command(BaseCommand):
 
     help = f'''Populates {DB_NAME} Database with the Data from csv-Files
 Located within {PATH_DATA}'''
 
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Number of Rows Read and Inserted at Once',
+        )
+        parser.add_argument(
+            '--upsert',
+            action='store_true',
+            help='''Merge Files into Populated Tables: Insert New Rows and
+Update Changed Ones by Primary Key''',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=WORKERS,
+            help='''Number of Independent Files Loaded Concurrently on
+Server Databases; SQLite Always Loads Files One by One''',
+        )
+        parser.add_argument(
+            '--path',
+            type=Path,
+            default=PATH,
+            help=f'Directory with csv-Files, {PATH_DATA} by Default',
+        )
+
     def handle(self, *args, **options) -> None:
+        if options['workers'] < 1:
+            raise CommandError('--workers Must Be Positive')
+        if options['workers'] > 1 and connection.vendor in SERIAL_VENDORS:
+            self.stdout.write(self.style.WARNING(
+                f'{connection.vendor} Does Not Support Concurrent Writes, '
+                'Loading Files One by One'
+            ))
+            options['workers'] = 1
+        self.show_progress = options['workers'] == 1
+        self.path = options['path']
 
-        for match in ModelFileMatch:
-            if match.model.objects.exists():
-                continue
-            with open(
-                Path(PATH).joinpath(match.value), encoding='utf8'
-            ) as file:
-                reader = csv.DictReader(file, fieldnames=match.fieldnames)
-                if match.fieldnames:
-                    next(reader)
-                match.model.objects.bulk_create(
-                    match.model(**_) for _ in reader
-                )
+        for number, stage in enumerate(build_stages(ModelFileMatch), 1):
+            started = time.perf_counter()
+            if options['workers'] == 1 or len(stage) == 1:
+                for match in stage:
+                    self.load_file(match, options)
+            else:
+                with ThreadPoolExecutor(
+                    max_workers=min(options['workers'], len(stage))
+                ) as pool:
+                    list(pool.map(
+                        lambda match: self.load_in_thread(match, options),
+                        stage
+                    ))
+            names = ', '.join(match.value for match in stage)
+            self.stdout.write(
+                f'Stage {number} ({names}): '
+                f'{time.perf_counter() - started:.2f} s'
+            )
+
+        call_command('recalculate_ratings', stdout=self.stdout)
+        # Массовая загрузка не отправляет сигналы моделей. Поколения
+        # увеличиваются после пересчёта рейтингов, иначе ответы с
+        # рейтингами до пересчёта закешировались бы под новым поколением.
+        bump_generations(Category, Genre, Review, Title)
 
         self.stdout.write(
             self.style.SUCCESS(
                 f'''Successfully Populated {DB_NAME} Database with the
-Data from csv-Files Located within {PATH_DATA}'''
+Data from csv-Files Located within {options['path']}'''
+            )
+        )
+
+    def load_file(self, match: ModelFileMatch, options: dict) -> None:
+        if options['upsert']:
+            self.load(match, options['batch_size'], upsert=True)
+        elif not match.model.objects.exists():
+            self.load(match, options['batch_size'])
+
+    def load_in_thread(self, match: ModelFileMatch, options: dict) -> None:
+        """Загрузка в рабочем потоке со своим соединением с базой данных."""
+        try:
+            self.load_file(match, options)
+        finally:
+            connections.close_all()
+
+    def load(
+        self, match: ModelFileMatch, batch_size: int, upsert: bool = False
+    ) -> Counter:
+        """Загружает один файл в одной транзакции, сообщая о прогрессе."""
+        started = time.perf_counter()
+        counts = Counter()
+        fields = get_upsert_fields(match, self.path) if upsert else None
+        with transaction.atomic(), keep_dates(match, self.path):
+            for batch in read_batches(match, batch_size, self.path):
+                if upsert:
+                    counts.update(self.merge(match, batch, fields))
+                else:
+                    self.insert(match, batch)
+                    counts['inserted'] += len(batch)
+                counts['rows'] += len(batch)
+                if self.show_progress:
+                    self.report(match, counts, started, ending='\r')
+        self.report(match, counts, started)
+        return counts
+
+    def insert(self, match: ModelFileMatch, batch: list) -> None:
+        # Связи many-to-many вставляются напрямую в промежуточную таблицу.
+        match.model.objects.bulk_create(
+            batch,
+            batch_size=len(batch),
+            ignore_conflicts=match.model._meta.auto_created,
+        )
+
+    def merge(self, match: ModelFileMatch, batch: list, fields: list) -> dict:
+        """Вставляет новые и обновляет изменившиеся строки одной пачки."""
+        pk_field = match.model._meta.pk
+        for obj in batch:
+            obj.pk = pk_field.to_python(obj.pk)
+        loaded = [field.attname for field in fields]
+        if match.model is User:
+            loaded.append('token_version')
+        existing = match.model.objects.only(*loaded).in_bulk(
+            [obj.pk for obj in batch]
+        )
+
+        created, changed = split_batch(batch, existing, fields)
+        if created:
+            self.insert(match, created)
+        if changed and fields:
+            # bulk_update() не обновляет поля auto_now сам.
+            touched = [
+                field for field in match.model._meta.concrete_fields
+                if getattr(field, 'auto_now', False)
+            ]
+            for obj in changed:
+                for field in touched:
+                    field.pre_save(obj, add=False)
+            updated = [field.attname for field in fields + touched]
+            if match.model is User:
+                updated.append('token_version')
+                self.revoke_tokens(changed, existing, fields)
+            match.model.objects.bulk_update(changed, updated)
+        self.touch_titles(match, created, changed)
+        return {
+            'inserted': len(created),
+            'updated': len(changed),
+            'unchanged': len(batch) - len(created) - len(changed),
+        }
+
+    @staticmethod
+    def touch_titles(match: ModelFileMatch, created: list,
+                     changed: list) -> None:
+        """Обновляет время изменения произведений, у которых при слиянии
+        появились жанры или изменились жанры и категория: массовые
+        операции не отправляют сигналов, которые сделали бы это."""
+        if match.model is Title.genre.through and created:
+            titles = Title.objects.filter(
+                pk__in={link.title_id for link in created}
+            )
+        elif match.model in (Category, Genre) and changed:
+            titles = Title.objects.filter(
+                **{f'{match.model._meta.model_name}__in': changed}
             )
+        else:
+            return
+        Title.touch(titles)
+
+    def revoke_tokens(self, users: list, existing: dict, fields: list) -> None:
+        """bulk_update() обходит CustomUser.save(), поэтому версия токенов
+        пользователей со сменой прав доступа увеличивается здесь. После
+        фиксации транзакции их записи удаляются из кеша аутентификации, а
+        новая версия токенов запоминается.
+        """
+        access = [
+            field.attname for field in fields if field.name in ACCESS_FIELDS
+        ]
+        for user in users:
+            current = existing[user.pk]
+            user.token_version = current.token_version
+            if any(
+                getattr(user, name) != getattr(current, name)
+                for name in access
+            ):
+                user.token_version += 1
+                transaction.on_commit(
+                    partial(invalidate_user_record, user.pk)
+                )
+                transaction.on_commit(
+                    partial(set_token_version, user.pk, user.token_version)
+                )
+
+    def report(
+        self, match: ModelFileMatch, counts: Counter, started: float,
+        ending: Optional[str] = None
+    ) -> None:
+        elapsed = time.perf_counter() - started
+        rate = counts['rows'] / elapsed if elapsed else 0
+        self.stdout.write(
+            f'{match.model.__name__}: {counts["rows"]} Rows, '
+            f'{counts["inserted"]} Inserted, {counts["updated"]} Updated, '
+            f'{counts["unchanged"]} Unchanged, {rate:.0f} Rows/s',
+            ending=ending,
         )
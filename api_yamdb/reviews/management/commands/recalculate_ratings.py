@@ -0,0 +1,111 @@
+from functools import partial
+
+from api.cache import bump_generations
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, NullIf
+from django.utils import timezone
+
+from reviews.constants import DEFAULT_SINT
+from reviews.models import Review, Title
+
+BATCH_SIZE = 500
+RATING_FIELDS = ('rating_sum', 'rating_count', 'rating')
+
+
+def review_total(aggregate):
+    """Сумма или количество оценок произведения одним подзапросом."""
+    return Coalesce(Subquery(
+        Review.objects.filter(title=OuterRef('pk')).order_by().values(
+            'title'
+        ).annotate(total=aggregate).values('total')
+    ), DEFAULT_SINT)
+
+
+def get_actual_ratings() -> dict:
+    rating_sum = review_total(Sum('score'))
+    rating_count = review_total(Count('id'))
+    return {
+        'rating_sum': rating_sum,
+        'rating_count': rating_count,
+        'rating': rating_sum / NullIf(rating_count, DEFAULT_SINT),
+    }
+
+
+def get_drifted():
+    """Произведения, сохранённый рейтинг которых расходится с отзывами."""
+    return Title.objects.annotate(**{
+        f'actual_{name}': value
+        for name, value in get_actual_ratings().items()
+    }).filter(
+        ~Q(rating_sum=F('actual_rating_sum'))
+        | ~Q(rating_count=F('actual_rating_count'))
+        | Q(rating__isnull=True, actual_rating__isnull=False)
+        | Q(rating__isnull=False, actual_rating__isnull=True)
+        | Q(rating__isnull=False, actual_rating__isnull=False)
+        & ~Q(rating=F('actual_rating'))
+    )
+
+
+class Command(BaseCommand):
+
+    help = '''Recalculates Stored Title Ratings from Reviews and Reports
+Titles Whose Stored Values Have Drifted'''
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only Report Drift, Do not Write Anything',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Number of Titles Checked and Updated per Statement',
+        )
+
+    def handle(self, *args, **options) -> None:
+        """Ищет расхождения пачками по возрастанию id.
+
+        Новые значения вычисляются подзапросами в самом UPDATE, а не
+        переносятся из прочитанных строк, поэтому отзыв, созданный или
+        удалённый во время пересчёта, не затирается.
+        """
+        drifted = 0
+        last_id = 0
+        while True:
+            batch = list(get_drifted().filter(pk__gt=last_id).order_by(
+                'pk'
+            ).values('pk', *RATING_FIELDS, *(
+                f'actual_{name}' for name in RATING_FIELDS
+            ))[:options['batch_size']])
+            if not batch:
+                break
+            last_id = batch[-1]['pk']
+            drifted += len(batch)
+            if options['verbosity'] > 1:
+                for title in batch:
+                    self.stdout.write(f'Title {title["pk"]}: ' + ', '.join(
+                        f'{name.replace("rating_", "")} {title[name]} -> '
+                        f'{title[f"actual_{name}"]}'
+                        for name in RATING_FIELDS
+                    ))
+            if options['dry_run']:
+                continue
+            Title.objects.filter(
+                pk__in=[title['pk'] for title in batch]
+            ).update(**get_actual_ratings(), updated=timezone.now())
+
+        if drifted and not options['dry_run']:
+            # update() не отправляет сигналов, которые сбросили бы
+            # закешированные ответы с рейтингами.
+            transaction.on_commit(partial(bump_generations, Title))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Found {drifted} Title(s) with Drifted Ratings'
+                + ('' if options['dry_run'] else ', All Fixed')
+            )
+        )
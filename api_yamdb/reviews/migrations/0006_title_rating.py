@@ -0,0 +1,53 @@
+# Generated by Django 3.2 on 2026-10-17 07:08
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_title_rating(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    Review = apps.get_model('reviews', 'Review')
+    totals = Review.objects.values('title_id').annotate(
+        total=Sum('score'), count=Count('id')
+    ).order_by()
+    titles = []
+    for row in totals:
+        titles.append(Title(
+            pk=row['title_id'],
+            rating_sum=row['total'],
+            rating_count=row['count'],
+            rating=row['total'] // row['count'],
+        ))
+    Title.objects.bulk_update(
+        titles, ('rating_sum', 'rating_count', 'rating'), batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_alter_title_year'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='rating',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, verbose_name='Рейтинг'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество оценок'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Сумма оценок'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['name'], name='title_name_idx'),
+        ),
+        migrations.RunPython(fill_title_rating, migrations.RunPython.noop),
+    ]
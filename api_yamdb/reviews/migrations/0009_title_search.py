@@ -0,0 +1,27 @@
+# Generated by Django 3.2 on 2026-10-17 08:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+import reviews.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_review_comment_updated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleSearch',
+            fields=[
+                ('title', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search', serialize=False, to='reviews.title')),
+                ('query', reviews.models.SearchQueryField(db_column='reviews_title_search')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'reviews_title_search',
+                'managed': False,
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.2 on 2026-10-17 08:11
+
+from django.db import migrations, models
+
+# Индекс промежуточной таблицы автоматической связи many-to-many нельзя
+# описать в модели. В отличие от индекса Django по genre_id, он покрывает
+# фильтр по жанру без чтения строк таблицы.
+GENRE_TITLE_INDEX = 'title_genre_genre_title_idx'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0009_title_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['category', 'name'], name='title_category_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['year', 'name'], name='title_year_name_idx'),
+        ),
+        migrations.RunSQL(
+            f'CREATE INDEX {GENRE_TITLE_INDEX} '
+            'ON reviews_title_genre (genre_id, title_id)',
+            f'DROP INDEX {GENRE_TITLE_INDEX}',
+        ),
+    ]
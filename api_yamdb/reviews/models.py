@@ -3,8 +3,11 @@ from datetime import date
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import NullIf
+from django.utils import timezone
 
-from .constants import MAX_LENGTH_CHAR
+from .constants import DEFAULT_SINT, MAX_LENGTH_CHAR
 from .validators import PastOrPresentYearValidator
 
 User = get_user_model()
@@ -42,9 +45,20 @@ class Comment(models.Model):
         blank=True
     )
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    updated = models.DateTimeField('Дата изменения', auto_now=True)
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['review', '-pub_date'],
+                name='comment_review_pub_date_idx'
+            ),
+            models.Index(
+                fields=['review', 'updated'],
+                name='comment_review_updated_idx'
+            ),
+        ]
 
 
 class Genre(models.Model):
@@ -75,9 +89,20 @@ class Review(models.Model):
         validators=(MinValueValidator(1), MaxValueValidator(10))
     )
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    updated = models.DateTimeField('Дата изменения', auto_now=True)
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['title', '-pub_date'],
+                name='review_title_pub_date_idx'
+            ),
+            models.Index(
+                fields=['title', 'updated'],
+                name='review_title_updated_idx'
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['title', 'author'],
@@ -106,6 +131,97 @@ class Title(models.Model):
         null=True
     )
     genre = models.ManyToManyField(Genre)
+    rating_sum = models.PositiveIntegerField(
+        'Сумма оценок', default=DEFAULT_SINT, editable=False
+    )
+    rating_count = models.PositiveIntegerField(
+        'Количество оценок', default=DEFAULT_SINT, editable=False
+    )
+    rating = models.PositiveSmallIntegerField(
+        'Рейтинг', null=True, blank=True, editable=False
+    )
+    # Меняется и вместе с рейтингом, жанрами и категорией: от него
+    # зависит ETag ответов с произведениями.
+    updated = models.DateTimeField('Дата изменения', auto_now=True)
 
     class Meta:
         ordering = ['id']
+        indexes = [
+            models.Index(fields=['name'], name='title_name_idx'),
+            # Фильтры TitleFilter с сортировкой по названию.
+            models.Index(
+                fields=['category', 'name'], name='title_category_name_idx'
+            ),
+            models.Index(fields=['year', 'name'], name='title_year_name_idx'),
+            models.Index(fields=['updated'], name='title_updated_idx'),
+        ]
+
+    @classmethod
+    def shift_rating(cls, title_id, score_delta, count_delta=0):
+        """Атомарно сдвигает сохранённые сумму и количество оценок.
+
+        Рейтинг пересчитывается в том же UPDATE, поэтому чтение произведения
+        не требует агрегации по отзывам.
+        """
+        cls.shift_ratings(
+            cls.objects.filter(pk=title_id), score_delta, count_delta
+        )
+
+    @staticmethod
+    def shift_ratings(titles, score_delta, count_delta=0):
+        """Сдвигает рейтинги всех titles одним UPDATE; score_delta может
+        быть выражением, вычисляемым для каждого произведения."""
+        rating_sum = F('rating_sum') + score_delta
+        rating_count = F('rating_count') + count_delta
+        titles.update(
+            rating_sum=rating_sum,
+            rating_count=rating_count,
+            rating=rating_sum / NullIf(rating_count, DEFAULT_SINT),
+            updated=timezone.now(),
+        )
+
+    @staticmethod
+    def touch(titles):
+        """Обновляет время изменения titles, когда меняются выводимые в
+        них данные других моделей."""
+        titles.update(updated=timezone.now())
+
+
+class SearchMatch(models.Lookup):
+    """Условие MATCH полнотекстового индекса SQLite FTS5."""
+
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+class SearchQueryField(models.TextField):
+    """Скрытый столбец таблицы FTS5 с именем самой таблицы."""
+
+
+SearchQueryField.register_lookup(SearchMatch)
+
+
+class TitleSearch(models.Model):
+    """Строка полнотекстового индекса произведений (reviews.search).
+
+    Таблица FTS5 создаётся не миграциями, а после них и только на SQLite.
+    """
+
+    title = models.OneToOneField(
+        Title,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        db_constraint=False,
+        related_name='search'
+    )
+    query = SearchQueryField(db_column='reviews_title_search')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'reviews_title_search'
@@ -0,0 +1,328 @@
+"""Полнотекстовый поиск произведений по названию и описанию.
+
+На SQLite с модулем FTS5 поиск идёт по виртуальной таблице
+SEARCH_TABLE, которую триггеры синхронизируют с reviews_title при любых
+изменениях, включая bulk_create и update(). Иначе используется
+инвертированный индекс в памяти процесса: он строится при первом поиске
+и обновляется сигналами модели Title, поэтому не видит изменений в обход
+моделей (populate_db) до перезапуска процесса.
+
+Каждое слово запроса ищется как префикс, слова объединяются через И.
+Результаты упорядочены по BM25 с весами полей NAME_WEIGHT и
+DESCRIPTION_WEIGHT, одинаково для обоих индексов, и оба отдают все
+совпадения. Индекс в памяти упорядочивает их в Python: см. RankedQuerySet.
+"""
+import math
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.db.models.query import ModelIterable, QuerySet
+
+from .models import Title, TitleSearch
+
+FTS5 = 'fts5'
+MEMORY = 'memory'
+SEARCH_TABLE = TitleSearch._meta.db_table
+TOKEN = re.compile(r'[^\W_]+')
+MAX_TERMS = 8
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+FTS5_TABLE = f'''
+CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+    name, description, content='reviews_title', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 0', prefix='2 3'
+)'''
+FTS5_RANK = f'''
+INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rank)
+VALUES ('rank', 'bm25({NAME_WEIGHT}, {DESCRIPTION_WEIGHT})')'''
+FTS5_INSERT = f'''
+INSERT INTO {SEARCH_TABLE}(rowid, name, description)
+VALUES (new.id, new.name, new.description);'''
+FTS5_DELETE = f'''
+INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, name, description)
+VALUES ('delete', old.id, old.name, old.description);'''
+FTS5_TRIGGERS = {
+    f'{SEARCH_TABLE}_insert':
+        f'AFTER INSERT ON reviews_title BEGIN {FTS5_INSERT} END',
+    f'{SEARCH_TABLE}_delete':
+        f'AFTER DELETE ON reviews_title BEGIN {FTS5_DELETE} END',
+    f'{SEARCH_TABLE}_update':
+        'AFTER UPDATE OF name, description ON reviews_title '
+        f'BEGIN {FTS5_DELETE} {FTS5_INSERT} END',
+}
+FTS5_REBUILD = f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')"
+
+
+def tokenize(text: str) -> list:
+    """Слова текста в нижнем регистре, как их выделяет unicode61."""
+    return TOKEN.findall(text.lower())
+
+
+def remember_fts5_index(db, exists: bool) -> bool:
+    """Запоминает в обёртке соединения, есть ли в его базе индекс FTS5."""
+    db.fts5_index = (db.settings_dict['NAME'], exists)
+    return exists
+
+
+def create_fts5_index(db) -> bool:
+    """Создаёт таблицу FTS5 и триггеры, если их нет, и перестраивает
+    индекс, если что-то пришлось создать.
+
+    Вызывается после каждого migrate: при пересоздании таблицы
+    reviews_title миграциями SQLite удаляет её триггеры.
+    """
+    if db.vendor != 'sqlite':
+        return False
+    return remember_fts5_index(db, fill_fts5_index(db))
+
+
+def fill_fts5_index(db) -> bool:
+    with db.cursor() as cursor:
+        existing = {
+            name for name, in cursor.execute(
+                "SELECT name FROM sqlite_master WHERE name LIKE %s",
+                (f'{SEARCH_TABLE}%',)
+            )
+        }
+        missing = [
+            name for name in (SEARCH_TABLE, *FTS5_TRIGGERS)
+            if name not in existing
+        ]
+        if not missing:
+            return True
+        try:
+            cursor.execute(FTS5_TABLE)
+        except DatabaseError:
+            # SQLite собран без FTS5.
+            return False
+        cursor.execute(FTS5_RANK)
+        for name, body in FTS5_TRIGGERS.items():
+            cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {name} {body}')
+        cursor.execute(FTS5_REBUILD)
+    return True
+
+
+def has_fts5_index() -> bool:
+    """Есть ли индекс FTS5; схема проверяется один раз на соединение."""
+    if connection.vendor != 'sqlite':
+        return False
+    name, exists = getattr(connection, 'fts5_index', (None, None))
+    if name == connection.settings_dict['NAME']:
+        return exists
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+            (SEARCH_TABLE,)
+        )
+        return remember_fts5_index(
+            connection, cursor.fetchone() is not None
+        )
+
+
+def get_backend() -> str:
+    if settings.TITLE_SEARCH_BACKEND is not None:
+        return settings.TITLE_SEARCH_BACKEND
+    return FTS5 if has_fts5_index() else MEMORY
+
+
+def search_titles(queryset, query: str):
+    """Оставляет в queryset произведения, подходящие под запрос, и
+    упорядочивает их по убыванию релевантности."""
+    terms = tokenize(query)[:MAX_TERMS]
+    if not terms:
+        return queryset.none()
+    if get_backend() == FTS5:
+        expression = ' AND '.join(f'"{term}"*' for term in terms)
+        return queryset.filter(search__query__match=expression).order_by(
+            'search__rank', 'name'
+        )
+
+    ranked = memory_index.search(terms)
+    if not ranked:
+        return queryset.none()
+    return RankedQuerySet.rank(queryset, ranked)
+
+
+class RankedQuerySet(QuerySet):
+    """QuerySet найденных индексом в памяти произведений, которые
+    упорядочиваются в Python по позиции в ranking, а не в базе.
+
+    Срез выбирает первичные ключи всех совпадений, сортирует их и читает
+    из базы только строки среза; число объектов берётся из того же
+    списка ключей. order_by() возвращает обычный порядок базы: так
+    курсорная пагинация упорядочивает результаты поиска по-своему.
+    """
+
+    ranking = None
+    unranked = None
+
+    @classmethod
+    def rank(cls, queryset, ranked: list):
+        ranked_queryset = queryset.filter(pk__in=ranked)
+        ranked_queryset.__class__ = cls
+        ranked_queryset.ranking = {
+            pk: position for position, pk in enumerate(ranked)
+        }
+        # Строки среза выбираются без длинного списка pk__in поиска.
+        ranked_queryset.unranked = queryset
+        return ranked_queryset
+
+    def _clone(self):
+        clone = super()._clone()
+        clone.ranking = self.ranking
+        clone.unranked = self.unranked
+        return clone
+
+    def order_by(self, *field_names):
+        clone = super().order_by(*field_names)
+        clone.ranking = None
+        return clone
+
+    def sort(self, objects: list) -> None:
+        objects.sort(key=lambda obj: self.ranking[obj.pk])
+
+    def _fetch_all(self):
+        ranked = self._result_cache is None and self.ranking is not None and (
+            self._iterable_class is ModelIterable
+        )
+        super()._fetch_all()
+        if ranked and not self.query.is_sliced:
+            self.sort(self._result_cache)
+
+    def ranked_ids(self) -> list:
+        if not hasattr(self, '_ranked_ids'):
+            self._ranked_ids = sorted(
+                self.values_list('pk', flat=True).order_by(),
+                key=self.ranking.__getitem__
+            )
+        return self._ranked_ids
+
+    def count(self):
+        if self.ranking is None or self._result_cache is not None:
+            return super().count()
+        return len(self.ranked_ids())
+
+    def __getitem__(self, k):
+        if self.ranking is None or self._result_cache is not None or not (
+            isinstance(k, slice)
+        ):
+            return super().__getitem__(k)
+        objects = list(self.unranked.filter(pk__in=self.ranked_ids()[k]))
+        self.sort(objects)
+        return objects
+
+
+class MemoryIndex:
+    """Инвертированный индекс: для каждого слова - произведения и число
+    его вхождений в название и описание. Слова хранятся ещё и
+    отсортированным списком, чтобы находить их по префиксу бинарным
+    поиском."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self.lock:
+            self.loaded = False
+            self.postings = defaultdict(dict)
+            self.words = []
+            self.documents = {}
+            self.total_length = 0
+
+    def load(self) -> None:
+        with self.lock:
+            if self.loaded:
+                return
+            for pk, name, description in Title.objects.values_list(
+                'pk', 'name', 'description'
+            ).iterator():
+                self.add(pk, name, description, force=True)
+            self.loaded = True
+
+    def add(self, pk, name, description, force=False) -> None:
+        with self.lock:
+            if not (self.loaded or force):
+                return
+            self.remove(pk, force=force)
+            name_words = Counter(tokenize(name))
+            description_words = Counter(tokenize(description))
+            for word in name_words.keys() | description_words.keys():
+                if word not in self.postings:
+                    insort(self.words, word)
+                self.postings[word][pk] = (
+                    name_words[word], description_words[word]
+                )
+            length = sum(name_words.values()) + sum(
+                description_words.values()
+            )
+            self.documents[pk] = (
+                name_words.keys() | description_words.keys(), length
+            )
+            self.total_length += length
+
+    def remove(self, pk, force=False) -> None:
+        with self.lock:
+            if not (self.loaded or force) or pk not in self.documents:
+                return
+            words, length = self.documents.pop(pk)
+            self.total_length -= length
+            for word in words:
+                postings = self.postings[word]
+                del postings[pk]
+                if not postings:
+                    del self.postings[word]
+                    del self.words[bisect_left(self.words, word)]
+
+    def match_prefix(self, prefix: str) -> dict:
+        """Взвешенное число вхождений слов с префиксом в каждое
+        произведение."""
+        frequencies = defaultdict(float)
+        for index in range(bisect_left(self.words, prefix), len(self.words)):
+            word = self.words[index]
+            if not word.startswith(prefix):
+                break
+            for pk, (in_name, in_description) in self.postings[word].items():
+                frequencies[pk] += (
+                    NAME_WEIGHT * in_name + DESCRIPTION_WEIGHT * in_description
+                )
+        return frequencies
+
+    def search(self, terms: list) -> list:
+        """Первичные ключи всех совпадений по убыванию BM25."""
+        self.load()
+        with self.lock:
+            matches = [self.match_prefix(term) for term in terms]
+            matches.sort(key=len)
+            if not matches[0]:
+                return []
+            found = set(matches[0]).intersection(*matches[1:])
+            total = len(self.documents)
+            average = self.total_length / total
+            scores = {pk: 0.0 for pk in found}
+            for frequencies in matches:
+                # Как в FTS5: отрицательная idf частых слов заменяется
+                # близкой к нулю.
+                idf = max(math.log(
+                    (total - len(frequencies) + 0.5)
+                    / (len(frequencies) + 0.5)
+                ), 1e-6)
+                for pk in found:
+                    frequency = frequencies[pk]
+                    norm = 1 - BM25_B + BM25_B * (
+                        self.documents[pk][1] / average
+                    )
+                    scores[pk] += idf * frequency * (BM25_K1 + 1) / (
+                        frequency + BM25_K1 * norm
+                    )
+        return sorted(found, key=lambda pk: (-scores[pk], pk))
+
+
+memory_index = MemoryIndex()
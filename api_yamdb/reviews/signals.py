@@ -0,0 +1,129 @@
+import threading
+import weakref
+from functools import partial
+
+from django.db import connections, transaction
+from django.db.models import OuterRef, Subquery
+from django.db.models.signals import (post_delete, post_migrate, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from .models import Review, Title, User
+from .search import create_fts5_index, memory_index
+
+# Отзывы, которые удаляются сейчас в этом потоке: между pre_delete и
+# post_delete. Слабые ссылки не держат отзывы неудавшегося удаления.
+deleting = threading.local()
+
+
+@receiver(post_save, sender=Title)
+def index_title(sender, instance, **kwargs):
+    transaction.on_commit(partial(
+        memory_index.add, instance.pk, instance.name, instance.description
+    ))
+
+
+@receiver(post_delete, sender=Title)
+def unindex_title(sender, instance, **kwargs):
+    transaction.on_commit(partial(memory_index.remove, instance.pk))
+
+
+@receiver(pre_save, sender=Review)
+def load_old_score(sender, instance, using, update_fields=None, **kwargs):
+    """Запоминает оценку и произведение отзыва до изменения.
+
+    Внутри транзакции строка отзыва блокируется до её конца, чтобы
+    параллельное изменение того же отзыва не сдвинуло рейтинг дважды.
+    """
+    instance._old_rating = None
+    if instance._state.adding or update_fields is not None and not (
+        {'score', 'title'} & set(update_fields)
+    ):
+        return
+    reviews = Review.objects.using(using).filter(pk=instance.pk)
+    if not transaction.get_autocommit(using):
+        reviews = reviews.select_for_update()
+    instance._old_rating = reviews.values_list('title_id', 'score').first()
+
+
+@receiver(post_save, sender=Review)
+def shift_rating_on_save(sender, instance, created, **kwargs):
+    """Сдвигает сохранённый рейтинг на разницу оценок. Сигналы
+    срабатывают и при изменениях вне API (админка, каскады), но не при
+    QuerySet.update() и bulk_create(): после них рейтинг пересчитывает
+    команда recalculate_ratings."""
+    old = getattr(instance, '_old_rating', None)
+    if created:
+        Title.shift_rating(instance.title_id, instance.score, 1)
+    elif old is None or old == (instance.title_id, instance.score):
+        return
+    elif old[0] == instance.title_id:
+        Title.shift_rating(instance.title_id, instance.score - old[1])
+    else:
+        Title.shift_rating(old[0], -old[1], -1)
+        Title.shift_rating(instance.title_id, instance.score, 1)
+    instance._old_rating = instance.title_id, instance.score
+
+
+def get_deleting_reviews():
+    if not hasattr(deleting, 'reviews'):
+        deleting.reviews = weakref.WeakValueDictionary()
+    return deleting.reviews
+
+
+def settle_reviews(attname, pk):
+    """Отмечает удаляемые отзывы, у которых attname равен pk: их рейтинг
+    учитывается удаляющим, а не по одному в post_delete. Возвращает
+    отмеченные отзывы без повторов."""
+    settled = {}
+    for review in list(get_deleting_reviews().values()):
+        if getattr(review, attname) == pk and not getattr(
+            review, '_rating_settled', False
+        ):
+            review._rating_settled = True
+            settled[review.pk] = review
+    return settled.values()
+
+
+@receiver(pre_delete, sender=Review)
+def track_deleted_review(sender, instance, **kwargs):
+    # При каскадном удалении pre_delete всех отзывов приходит раньше, чем
+    # pre_delete их произведения или автора.
+    get_deleting_reviews()[id(instance)] = instance
+
+
+@receiver(pre_delete, sender=Title)
+def skip_deleted_title_reviews(sender, instance, **kwargs):
+    """Рейтинг удаляемого произведения не пересчитывается."""
+    settle_reviews('title_id', instance.pk)
+
+
+@receiver(pre_delete, sender=User)
+def shift_deleted_author_ratings(sender, instance, **kwargs):
+    """Оценки удаляемого автора вычитаются из всех его произведений одним
+    UPDATE: у автора не больше одного отзыва на произведение, и его оценка
+    читается подзапросом по уникальному индексу."""
+    if not settle_reviews('author_id', instance.pk):
+        return
+    reviews = Review.objects.filter(author=instance.pk)
+    Title.shift_ratings(
+        Title.objects.filter(pk__in=reviews.values('title_id')),
+        -Subquery(
+            reviews.filter(title=OuterRef('pk')).values('score')[:1]
+        ),
+        -1
+    )
+
+
+@receiver(post_delete, sender=Review)
+def shift_rating_on_delete(sender, instance, **kwargs):
+    get_deleting_reviews().pop(id(instance), None)
+    if not getattr(instance, '_rating_settled', False):
+        Title.shift_rating(instance.title_id, -instance.score, -1)
+
+
+@receiver(post_migrate)
+def create_search_index(sender, using, **kwargs):
+    if sender.label == Title._meta.app_label:
+        create_fts5_index(connections[using])
+        memory_index.reset()
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 
-from .models import CustomUser
+from .models import CustomUser, EmailOutbox
 
 
 @admin.register(CustomUser)
@@ -10,3 +10,13 @@ class CustomUserAdmin(UserAdmin):
 
     model = CustomUser
     ordering = ['email']
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    """Очередь исходящих писем."""
+
+    list_display = ['recipient', 'subject', 'created_at', 'sent_at',
+                    'attempts']
+    list_filter = ['sent_at']
+    empty_value_display = '-пусто-'
@@ -0,0 +1,262 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from api_yamdb.metrics import CACHE_REQUESTS, HIT, MISS
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (AuthenticationFailed,
+                                                 InvalidToken)
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .constants import (AUTH_TOKEN_VERSION_KEY, AUTH_USER_CACHE_FIELDS,
+                        AUTH_USER_CACHE_KEY, TOKEN_ROLE_CLAIM,
+                        TOKEN_VERSION_CLAIM)
+from .models import CustomUser
+
+# Метки кешей в метрике yamdb_cache_requests_total.
+LOCAL_CACHE = 'auth_user'
+SHARED_CACHE = 'auth_user_shared'
+
+
+class UserRecordCache:
+    """Ограниченный LRU-кеш записей пользователей со временем жизни."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._records = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._records.get(user_id)
+            if entry is None:
+                return None
+            expires_at, record = entry
+            if expires_at < time.monotonic():
+                del self._records[user_id]
+                return None
+            self._records.move_to_end(user_id)
+            return record
+
+    def set(self, user_id, record):
+        with self._lock:
+            self._records[user_id] = (time.monotonic() + self.ttl, record)
+            self._records.move_to_end(user_id)
+            while len(self._records) > self.max_size:
+                self._records.popitem(last=False)
+
+    def add(self, user_id, record, ttl=None):
+        """Запоминает запись, только если действующей записи ещё нет."""
+        with self._lock:
+            entry = self._records.get(user_id)
+            if entry is not None and entry[0] >= time.monotonic():
+                return
+            self._records[user_id] = (
+                time.monotonic() + (self.ttl if ttl is None else ttl), record
+            )
+            self._records.move_to_end(user_id)
+            while len(self._records) > self.max_size:
+                self._records.popitem(last=False)
+
+    def delete(self, user_id):
+        with self._lock:
+            self._records.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+
+user_cache = UserRecordCache(
+    settings.AUTH_USER_CACHE_SIZE, settings.AUTH_USER_CACHE_TTL
+)
+# Версии токенов живут, пока действуют выданные с ними токены.
+TOKEN_VERSION_TTL = int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
+token_version_cache = UserRecordCache(
+    settings.AUTH_USER_CACHE_SIZE, TOKEN_VERSION_TTL
+)
+
+
+def get_shared_cache():
+    if settings.AUTH_USER_SHARED_CACHE is None:
+        return None
+    return caches[settings.AUTH_USER_SHARED_CACHE]
+
+
+def get_cached_field_names():
+    """Поля кеша в порядке полей модели, как того требует Model.from_db()."""
+    return tuple(
+        field.attname
+        for field in get_user_model()._meta.concrete_fields
+        if field.attname in AUTH_USER_CACHE_FIELDS
+    )
+
+
+def get_user_record(user_id):
+    """Запись пользователя из локального, общего кеша или базы данных."""
+    record = user_cache.get(user_id)
+    CACHE_REQUESTS.inc(LOCAL_CACHE, MISS if record is None else HIT)
+    if record is not None:
+        return record
+
+    shared_cache = get_shared_cache()
+    key = AUTH_USER_CACHE_KEY.format(user_id)
+    if shared_cache is not None:
+        record = shared_cache.get(key)
+        CACHE_REQUESTS.inc(SHARED_CACHE, MISS if record is None else HIT)
+
+    if record is None:
+        record = get_user_model().objects.filter(
+            **{api_settings.USER_ID_FIELD: user_id}
+        ).values_list(*get_cached_field_names()).first()
+        if record is None:
+            return None
+        if shared_cache is not None:
+            shared_cache.set(key, record, settings.AUTH_USER_CACHE_TTL)
+
+    user_cache.set(user_id, record)
+    return record
+
+
+def invalidate_user_record(user_id):
+    user_cache.delete(user_id)
+    shared_cache = get_shared_cache()
+    if shared_cache is not None:
+        shared_cache.delete(AUTH_USER_CACHE_KEY.format(user_id))
+
+
+def set_token_version(user_id, version):
+    """Запоминает текущую версию токенов пользователя.
+
+    Вызывается при каждом сохранении и удалении пользователя: по этим
+    записям запросы на чтение отклоняют отозванные токены без обращения к
+    базе данных.
+    """
+    token_version_cache.set(user_id, version)
+    shared_cache = get_shared_cache()
+    if shared_cache is not None:
+        shared_cache.set(
+            AUTH_TOKEN_VERSION_KEY.format(user_id), version, TOKEN_VERSION_TTL
+        )
+
+
+def seed_token_version(user_id, version):
+    """Запоминает версию из записи пользователя, не затирая записи
+    set_token_version(): запись, сделанная после чтения, новее.
+
+    Запись пользователя могла устареть в кеше другого процесса, поэтому
+    версия из неё живёт не дольше AUTH_USER_CACHE_TTL.
+    """
+    token_version_cache.add(user_id, version, settings.AUTH_USER_CACHE_TTL)
+    shared_cache = get_shared_cache()
+    if shared_cache is not None:
+        shared_cache.add(
+            AUTH_TOKEN_VERSION_KEY.format(user_id), version,
+            settings.AUTH_USER_CACHE_TTL
+        )
+
+
+def get_token_version(user_id):
+    """Известная версия токенов пользователя или None, без базы данных."""
+    version = token_version_cache.get(user_id)
+    if version is not None:
+        return version
+    shared_cache = get_shared_cache()
+    if shared_cache is None:
+        return None
+    version = shared_cache.get(AUTH_TOKEN_VERSION_KEY.format(user_id))
+    if version is not None:
+        token_version_cache.add(
+            user_id, version, settings.AUTH_USER_CACHE_TTL
+        )
+    return version
+
+
+class RoleTokenUser(TokenUser):
+    """Пользователь, восстановленный из утверждений токена."""
+
+    Role = CustomUser.Role
+    is_admin = CustomUser.is_admin
+    is_moderator = CustomUser.is_moderator
+
+    @cached_property
+    def role(self):
+        return self.token.get(TOKEN_ROLE_CLAIM)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWT-аутентификация, берущая пользователя из кеша.
+
+    Возвращает пользователя, у которого загружены только поля
+    AUTH_USER_CACHE_FIELDS; остальные поля подгружаются из базы данных при
+    первом обращении. Токены с устаревшей версией отклоняются.
+
+    При включённой настройке AUTH_TOKEN_USER запросы на чтение получают
+    RoleTokenUser, собранный из утверждений токена, не загружая
+    пользователя: версия токена сверяется с записями set_token_version().
+    Если записи нет, пользователь загружается, как и при записи, а его
+    версия запоминается для следующих запросов.
+    """
+
+    read_only = False
+
+    def authenticate(self, request):
+        self.read_only = request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _('Token contained no recognizable user identification')
+            )
+
+        version = validated_token.get(TOKEN_VERSION_CLAIM)
+        if (
+            version is not None and self.read_only
+            and settings.AUTH_TOKEN_USER
+        ):
+            current_version = get_token_version(user_id)
+            if current_version is None:
+                self.load_user(user_id, version)
+            elif current_version != version:
+                raise AuthenticationFailed(
+                    _('Token has been revoked'), code='token_revoked'
+                )
+            return RoleTokenUser(validated_token)
+
+        return self.load_user(user_id, version)
+
+    def load_user(self, user_id, version):
+        """Пользователь из кеша записей; токен с другой версией отозван."""
+        record = get_user_record(user_id)
+        if record is None:
+            raise AuthenticationFailed(
+                _('User not found'), code='user_not_found'
+            )
+
+        user = self.user_model.from_db(
+            DEFAULT_DB_ALIAS, get_cached_field_names(), record
+        )
+        if not user.is_active:
+            raise AuthenticationFailed(
+                _('User is inactive'), code='user_inactive'
+            )
+
+        if version is not None:
+            seed_token_version(user_id, user.token_version)
+            if version != user.token_version:
+                raise AuthenticationFailed(
+                    _('Token has been revoked'), code='token_revoked'
+                )
+        return user
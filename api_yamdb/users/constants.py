@@ -7,3 +7,33 @@ MAX_LENGTH_MAIL = 254
 MAX_LENGTH_ROLE = 20
 
 USERNAME_RESERVED = 'me'
+
+EMAIL_OUTBOX_BATCH_SIZE = 100
+
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+
+EMAIL_OUTBOX_WORKERS = 4
+
+# Секунды, на которые send_emails захватывает пачку писем.
+EMAIL_OUTBOX_LEASE = 300
+
+# Секунды до повторной отправки письма; удваиваются с каждой попыткой.
+EMAIL_OUTBOX_RETRY_DELAY = 60
+
+AUTH_USER_CACHE_FIELDS = (
+    'id', 'username', 'role', 'is_staff', 'is_superuser', 'is_active',
+    'token_version',
+)
+
+AUTH_USER_CACHE_KEY = 'auth_user:{}'
+
+AUTH_TOKEN_VERSION_KEY = 'auth_token_version:{}'
+
+# Версия токенов удалённого пользователя.
+TOKEN_VERSION_REVOKED = -1
+
+ACCESS_FIELDS = ('role', 'is_staff', 'is_superuser', 'is_active')
+
+TOKEN_ROLE_CLAIM = 'role'
+
+TOKEN_VERSION_CLAIM = 'ver'
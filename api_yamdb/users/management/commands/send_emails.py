@@ -0,0 +1,164 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+from django.utils import timezone
+
+from users.constants import (EMAIL_OUTBOX_BATCH_SIZE, EMAIL_OUTBOX_LEASE,
+                             EMAIL_OUTBOX_MAX_ATTEMPTS,
+                             EMAIL_OUTBOX_RETRY_DELAY, EMAIL_OUTBOX_WORKERS)
+from users.models import EmailOutbox
+
+RELEASED = {'claim': None, 'claimed_until': None}
+
+
+def claim_batch(last_id, batch_size):
+    """Захватывает следующую пачку писем, которые не держит другой процесс.
+
+    Возвращает id последнего просмотренного письма (None, если очередь
+    пройдена) и захваченные письма. UPDATE заново проверяет, что захват
+    свободен, поэтому письмо, выбранное сразу несколькими процессами,
+    достаётся одному из них; свои письма процесс находит по метке claim.
+    Захват упавшего процесса истекает через EMAIL_OUTBOX_LEASE секунд.
+    """
+    now = timezone.now()
+    pending = EmailOutbox.objects.filter(
+        Q(claimed_until__isnull=True) | Q(claimed_until__lt=now),
+        sent_at__isnull=True,
+        attempts__lt=EMAIL_OUTBOX_MAX_ATTEMPTS,
+    )
+    ids = list(pending.filter(id__gt=last_id).order_by('id').values_list(
+        'id', flat=True
+    )[:batch_size])
+    if not ids:
+        return None, []
+    claim = uuid.uuid4()
+    pending.filter(pk__in=ids).update(
+        claim=claim, claimed_until=now + timedelta(seconds=EMAIL_OUTBOX_LEASE)
+    )
+    return ids[-1], list(EmailOutbox.objects.filter(claim=claim))
+
+
+def send_chunk(chunk):
+    """Отправляет пачку писем через одно соединение с почтовым сервером.
+
+    Возвращает пары (id письма, текст ошибки или None); если сервер
+    недоступен, ошибка возвращается для каждого письма пачки. Поток не
+    обращается к базе данных: все записи делает основной поток команды.
+    """
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as error:
+        return [(email.pk, str(error) or repr(error)) for email in chunk]
+    results = []
+    try:
+        for email in chunk:
+            message = EmailMessage(
+                subject=email.subject,
+                body=email.message,
+                from_email=email.from_email,
+                to=[email.recipient],
+                connection=connection,
+            )
+            try:
+                message.send()
+            except Exception as error:
+                results.append((email.pk, str(error) or repr(error)))
+            else:
+                results.append((email.pk, None))
+    finally:
+        connection.close()
+    return results
+
+
+class Command(BaseCommand):
+
+    help = '''Sends Emails Queued in the Outbox Using a Pool of Workers,
+Each Delivering Many Messages per Connection'''
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=EMAIL_OUTBOX_BATCH_SIZE,
+            help='Number of Emails Fetched from the Outbox at Once',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=EMAIL_OUTBOX_WORKERS,
+            help='Number of Concurrent Connections to the Mail Server',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep Polling the Outbox Instead of Exiting When Drained',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Seconds to Wait Between Polls in --loop Mode',
+        )
+
+    def handle(self, *args, **options) -> None:
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                sent, failed = self.drain(
+                    pool, options['batch_size'], options['workers']
+                )
+                if sent or failed or options['verbosity'] > 1:
+                    self.stdout.write(
+                        self.style.SUCCESS(
+                            f'Sent {sent} Email(s), {failed} Failed'
+                        )
+                    )
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+
+    def drain(self, pool, batch_size, workers):
+        """Один проход по очереди: каждое письмо пробуется не более раза.
+        Письма, захваченные другими процессами, пропускаются. Неотправленное
+        письмо остаётся захваченным на EMAIL_OUTBOX_RETRY_DELAY секунд,
+        удвоенных за каждую прошлую попытку."""
+        sent = failed = 0
+        last_id = 0
+        while True:
+            last_id, batch = claim_batch(last_id, batch_size)
+            if last_id is None:
+                return sent, failed
+            if not batch:
+                continue
+
+            chunk_size = -(-len(batch) // workers)
+            chunks = [
+                batch[start:start + chunk_size]
+                for start in range(0, len(batch), chunk_size)
+            ]
+            attempts = {email.pk: email.attempts for email in batch}
+            sent_ids = []
+            for results in pool.map(send_chunk, chunks):
+                for pk, error in results:
+                    if error is None:
+                        sent_ids.append(pk)
+                        continue
+                    failed += 1
+                    delay = EMAIL_OUTBOX_RETRY_DELAY * 2 ** attempts[pk]
+                    EmailOutbox.objects.filter(pk=pk).update(
+                        attempts=F('attempts') + 1, last_error=error,
+                        claim=None,
+                        claimed_until=timezone.now() + timedelta(
+                            seconds=delay
+                        ),
+                    )
+            EmailOutbox.objects.filter(pk__in=sent_ids).update(
+                sent_at=timezone.now(), attempts=F('attempts') + 1,
+                **RELEASED
+            )
+            sent += len(sent_ids)
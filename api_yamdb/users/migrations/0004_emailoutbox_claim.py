@@ -0,0 +1,23 @@
+# Generated by Django 3.2 on 2026-10-17 08:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_customuser_token_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emailoutbox',
+            name='claim',
+            field=models.UUIDField(blank=True, null=True, verbose_name='Захвачено'),
+        ),
+        migrations.AddField(
+            model_name='emailoutbox',
+            name='claimed_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Захвачено до'),
+        ),
+    ]
@@ -3,8 +3,8 @@ from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
-from .constants import (MAX_LENGTH_CHAR, MAX_LENGTH_CHAR_BIO, MAX_LENGTH_MAIL,
-                        MAX_LENGTH_ROLE)
+from .constants import (ACCESS_FIELDS, MAX_LENGTH_CHAR, MAX_LENGTH_CHAR_BIO,
+                        MAX_LENGTH_MAIL, MAX_LENGTH_ROLE)
 from .validators import CustomUsernameValidator
 
 
@@ -49,6 +49,13 @@ class CustomUser(AbstractUser):
         verbose_name='Код подтверждения',
         max_length=MAX_LENGTH_CHAR
     )
+    token_version = models.PositiveIntegerField(
+        'Версия токенов',
+        default=0,
+        editable=False,
+        help_text='Увеличивается при смене прав доступа, отзывая выданные '
+                  'ранее токены.'
+    )
 
     class Meta:
         ordering = ['id']
@@ -58,6 +65,29 @@ class CustomUser(AbstractUser):
     def __str__(self):
         return self.username
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_access = instance._get_access()
+        instance._loaded_username = instance.__dict__.get('username')
+        return instance
+
+    def save(self, *args, **kwargs):
+        loaded_access = getattr(self, '_loaded_access', None)
+        access = self._get_access()
+        if loaded_access is not None and loaded_access != access:
+            self.token_version += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'token_version'}
+        super().save(*args, **kwargs)
+        self._loaded_access = access
+        self._loaded_username = self.username
+
+    def _get_access(self):
+        """Загруженные значения полей, определяющих права доступа."""
+        return tuple(self.__dict__.get(name) for name in ACCESS_FIELDS)
+
     @property
     def is_admin(self):
         return self.role == self.Role.ADMIN or self.is_staff
@@ -65,3 +95,31 @@ class CustomUser(AbstractUser):
     @property
     def is_moderator(self):
         return self.role == self.Role.MODERATOR
+
+
+class EmailOutbox(models.Model):
+    """Исходящие письма, ожидающие отправки командой send_emails."""
+
+    subject = models.CharField('Тема', max_length=MAX_LENGTH_CHAR_BIO)
+    message = models.TextField('Текст')
+    from_email = models.EmailField('Отправитель', max_length=MAX_LENGTH_MAIL)
+    recipient = models.EmailField('Получатель', max_length=MAX_LENGTH_MAIL)
+    created_at = models.DateTimeField('Дата создания', auto_now_add=True)
+    sent_at = models.DateTimeField('Дата отправки', null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField('Попытки', default=0)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    claim = models.UUIDField('Захвачено', null=True, blank=True)
+    claimed_until = models.DateTimeField(
+        'Захвачено до', null=True, blank=True
+    )
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['sent_at', 'id'], name='outbox_pending_idx'),
+        ]
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+
+    def __str__(self):
+        return f'{self.recipient}: {self.subject}'
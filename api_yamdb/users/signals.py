@@ -0,0 +1,18 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_user_record, set_token_version
+from .constants import TOKEN_VERSION_REVOKED
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_cached_user(sender, instance, **kwargs):
+    invalidate_user_record(instance.pk)
+    set_token_version(instance.pk, instance.token_version)
+
+
+@receiver(post_delete, sender=get_user_model())
+def revoke_deleted_user(sender, instance, **kwargs):
+    invalidate_user_record(instance.pk)
+    set_token_version(instance.pk, TOKEN_VERSION_REVOKED)
@@ -1,6 +1,8 @@
 import os
 import sys
 
+import pytest
+from django.conf import settings
 from django.utils.version import get_version
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -33,3 +35,13 @@ assert get_version() < '4.0.0', 'Пожалуйста, используйте в
 pytest_plugins = [
     'tests.fixtures.fixture_user',
 ]
+
+
+@pytest.fixture(scope='session')
+def django_db_modify_db_settings(tmp_path_factory):
+    # База в памяти с общим кешем SQLite сразу отвечает «table is locked»
+    # на параллельную запись; файловая база ждёт освобождения блокировки,
+    # как и db.sqlite3 проекта.
+    settings.DATABASES['default']['TEST']['NAME'] = str(
+        tmp_path_factory.mktemp('db') / 'test_db.sqlite3'
+    )
@@ -3,6 +3,7 @@ from http import HTTPStatus
 import pytest
 from django.core import mail
 from django.db.utils import IntegrityError
+from django.test import override_settings
 
 from tests.utils import (
     invalid_data_for_user_patch_and_creation,
@@ -104,6 +105,7 @@ class Test00UserRegistration:
             'содержанию - новый пользователь не должен быть создан.'
         )
 
+    @override_settings(EMAIL_USE_OUTBOX=False)
     def test_00_valid_data_user_signup(self, client, django_user_model):
         outbox_before_count = len(mail.outbox)
         valid_data = {
@@ -150,6 +152,25 @@ class Test00UserRegistration:
 
         new_user.delete()
 
+    def test_00_signup_query_budget(self, client, django_user_model,
+                                    django_assert_num_queries):
+        valid_data = {
+            'email': 'budget@yamdb.fake',
+            'username': 'budget_username'
+        }
+        for attempt in ('новый', 'повторный'):
+            # Поиск по логину и почте, BEGIN, INSERT или UPDATE кода и
+            # INSERT письма в очередь.
+            with django_assert_num_queries(4):
+                response = client.post(self.URL_SIGNUP, data=valid_data)
+            assert response.status_code == HTTPStatus.OK, (
+                f'Проверьте, что {attempt} POST-запрос к `{self.URL_SIGNUP}` '
+                'с корректными данными возвращает ответ со статусом 200.'
+            )
+        assert django_user_model.objects.filter(
+            username=valid_data['username']
+        ).count() == 1
+
     def test_00_valid_data_admin_create_user(self,
                                              admin_client,
                                              django_user_model):
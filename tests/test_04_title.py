@@ -353,3 +353,25 @@ class Test04TitleAPI:
             f'Проверьте, что PUT-запрос к `{self.TITLES_DETAIL_URL_TEMPLATE} '
             'не предусмотрен и возвращает статус 405.'
         )
+
+    def test_07_titles_read_query_budget(self, client, admin_client,
+                                         django_assert_max_num_queries):
+        titles, _, _ = create_titles(admin_client)
+        with django_assert_max_num_queries(3):
+            response = client.get(self.TITLES_URL)
+        assert response.status_code == HTTPStatus.OK
+        assert len(response.json()['results']) == len(titles), (
+            f'Проверьте, что GET-запрос к `{self.TITLES_URL}` выполняет '
+            'фиксированное число запросов к базе данных независимо от '
+            'количества произведений на странице.'
+        )
+        with django_assert_max_num_queries(2):
+            response = client.get(
+                self.TITLES_DETAIL_URL_TEMPLATE.format(
+                    title_id=titles[0]['id']
+                )
+            )
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что GET-запрос к `{self.TITLES_DETAIL_URL_TEMPLATE}` '
+            'выполняет не более двух запросов к базе данных.'
+        )
@@ -1,7 +1,10 @@
 from http import HTTPStatus
 
 import pytest
+from api.pagination import PageNumberOrCursorPagination
+from django.db import connection
 from django.db.utils import IntegrityError
+from django.test.utils import CaptureQueriesContext
 
 from tests.utils import (
     check_fields, check_pagination, create_reviews, create_single_review,
@@ -413,3 +416,101 @@ class Test05ReviewAPI:
             f'Проверьте, что PUT-запрос к `{self.REVIEW_DETAIL_URL_TEMPLATE} '
             'не предусмотрен и возвращает статус 405.'
         )
+
+    def test_07_reviews_cursor_pagination(
+            self, client, admin_client, admin, user_client, user,
+            moderator_client, moderator, monkeypatch):
+        monkeypatch.setattr(PageNumberOrCursorPagination, 'page_size', 2)
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client
+        }
+        reviews, titles = create_reviews(admin_client, author_map)
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]['id'])
+
+        response = client.get(url, {'pagination': 'cursor'})
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert 'count' not in data and data['next'], (
+            f'Проверьте, что GET-запрос к `{self.REVIEWS_URL_TEMPLATE}` с '
+            'параметром `pagination=cursor` возвращает курсорную пагинацию '
+            'без подсчёта общего количества отзывов.'
+        )
+        received = [review['id'] for review in data['results']]
+        response = client.get(data['next'])
+        data = response.json()
+        received += [review['id'] for review in data['results']]
+        assert data['next'] is None
+        assert received == [review['id'] for review in reversed(reviews)], (
+            f'Проверьте, что курсорная пагинация `{self.REVIEWS_URL_TEMPLATE}` '
+            'возвращает все отзывы от новых к старым.'
+        )
+
+    def test_08_reviews_read_query_budget(
+            self, client, admin_client, admin, user_client, user,
+            moderator_client, moderator, django_assert_max_num_queries):
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client
+        }
+        reviews, titles = create_reviews(admin_client, author_map)
+        create_single_review(admin_client, titles[1]['id'], 'Другое', 3)
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]['id'])
+
+        with django_assert_max_num_queries(2):
+            response = client.get(url)
+        check_pagination(url, response.json(), len(reviews))
+
+        with django_assert_max_num_queries(1):
+            response = client.get(
+                self.REVIEW_DETAIL_URL_TEMPLATE.format(
+                    title_id=titles[0]['id'], review_id=reviews[0]['id']
+                )
+            )
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что GET-запрос к '
+            f'`{self.REVIEW_DETAIL_URL_TEMPLATE}` выполняет один запрос к '
+            'базе данных.'
+        )
+        response = client.get(
+            self.REVIEW_DETAIL_URL_TEMPLATE.format(
+                title_id=titles[1]['id'], review_id=reviews[0]['id']
+            )
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            'Проверьте, что отзыв недоступен по адресу чужого произведения '
+            f'`{self.REVIEW_DETAIL_URL_TEMPLATE}`.'
+        )
+
+    def test_09_review_write_permission_queries(
+            self, admin_client, admin, user_client, user, moderator_client,
+            moderator):
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client
+        }
+        reviews, titles = create_reviews(admin_client, author_map)
+        user_review_url = self.REVIEW_DETAIL_URL_TEMPLATE.format(
+            title_id=titles[0]['id'], review_id=reviews[1]['id']
+        )
+
+        for client, method, kwargs in (
+            (user_client, 'patch', {'data': {'text': 'Новый текст'}}),
+            (moderator_client, 'delete', {}),
+        ):
+            with CaptureQueriesContext(connection) as queries:
+                response = getattr(client, method)(user_review_url, **kwargs)
+            assert response.status_code in (
+                HTTPStatus.OK, HTTPStatus.NO_CONTENT
+            )
+            assert not any(
+                'FROM "users_customuser"' in query['sql']
+                for query in queries
+            ), (
+                f'Проверьте, что проверка прав при {method.upper()}-запросе '
+                f'к `{self.REVIEW_DETAIL_URL_TEMPLATE}` не загружает автора '
+                'отзыва из базы данных.'
+            )
@@ -1,6 +1,8 @@
 from http import HTTPStatus
 
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from tests.utils import (check_fields, check_pagination, create_comments,
                          create_reviews, create_single_comment)
@@ -366,3 +368,69 @@ class Test06CommentAPI:
             f'Проверьте, что PUT-запрос к `{self.COMMENT_DETAIL_URL_TEMPLATE} '
             'не предусмотрен и возвращает статус 405.'
         )
+
+    def test_08_comment_query_budget(self, client, admin_client, admin,
+                                     user_client, user, moderator_client,
+                                     moderator, django_assert_max_num_queries):
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client
+        }
+        comments, reviews, titles = create_comments(admin_client, author_map)
+        url = self.COMMENTS_URL_TEMPLATE.format(
+            title_id=titles[0]['id'], review_id=reviews[0]['id']
+        )
+
+        with django_assert_max_num_queries(3):
+            response = client.get(url)
+        check_pagination(url, response.json(), len(comments))
+
+        with django_assert_max_num_queries(3):
+            response = user_client.post(url, data={'text': 'Ещё один'})
+        assert response.status_code == HTTPStatus.CREATED, (
+            f'Проверьте, что POST-запрос к `{self.COMMENTS_URL_TEMPLATE}` '
+            'находит отзыв одним запросом к базе данных.'
+        )
+
+        response = client.get(
+            self.COMMENTS_URL_TEMPLATE.format(
+                title_id=titles[1]['id'], review_id=reviews[0]['id']
+            )
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            'Проверьте, что комментарии недоступны по адресу отзыва к '
+            f'чужому произведению `{self.COMMENTS_URL_TEMPLATE}`.'
+        )
+
+    def test_09_comment_write_permission_queries(
+            self, admin_client, admin, user_client, user, moderator_client,
+            moderator):
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client
+        }
+        comments, reviews, titles = create_comments(admin_client, author_map)
+        user_comment_url = self.COMMENT_DETAIL_URL_TEMPLATE.format(
+            title_id=titles[0]['id'], review_id=reviews[0]['id'],
+            comment_id=comments[1]['id']
+        )
+
+        for client, method, kwargs in (
+            (user_client, 'patch', {'data': {'text': 'Новый текст'}}),
+            (moderator_client, 'delete', {}),
+        ):
+            with CaptureQueriesContext(connection) as queries:
+                response = getattr(client, method)(user_comment_url, **kwargs)
+            assert response.status_code in (
+                HTTPStatus.OK, HTTPStatus.NO_CONTENT
+            )
+            assert not any(
+                'FROM "users_customuser"' in query['sql']
+                for query in queries
+            ), (
+                f'Проверьте, что проверка прав при {method.upper()}-запросе '
+                f'к `{self.COMMENT_DETAIL_URL_TEMPLATE}` не загружает автора '
+                'комментария из базы данных.'
+            )
@@ -0,0 +1,133 @@
+from datetime import timedelta
+from http import HTTPStatus
+
+import pytest
+from django.core import mail
+from django.core.management import call_command
+from django.utils import timezone
+from users.management.commands.send_emails import claim_batch
+from users.models import EmailOutbox
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08EmailOutbox:
+
+    URL_SIGNUP = '/api/v1/auth/signup/'
+
+    def test_01_signup_queues_email(self, client, settings):
+        settings.EMAIL_USE_OUTBOX = True
+        outbox_before_count = len(mail.outbox)
+        valid_data = {
+            'email': 'valid@yamdb.fake',
+            'username': 'valid_username'
+        }
+
+        response = client.post(self.URL_SIGNUP, data=valid_data)
+        assert response.status_code == HTTPStatus.OK
+        assert len(mail.outbox) == outbox_before_count, (
+            'Если включена настройка `EMAIL_USE_OUTBOX`, при регистрации '
+            'письмо не должно отправляться синхронно.'
+        )
+        queued = EmailOutbox.objects.get()
+        assert queued.recipient == valid_data['email']
+        assert queued.sent_at is None
+
+        call_command('send_emails', workers=2)
+        assert len(mail.outbox) == outbox_before_count + 1, (
+            'Проверьте, что команда `send_emails` отправляет письма из '
+            'очереди.'
+        )
+        assert valid_data['email'] in mail.outbox[-1].to
+        queued.refresh_from_db()
+        assert queued.sent_at is not None, (
+            'Проверьте, что команда `send_emails` отмечает отправленные '
+            'письма.'
+        )
+
+        call_command('send_emails')
+        assert len(mail.outbox) == outbox_before_count + 1, (
+            'Проверьте, что команда `send_emails` не отправляет письма '
+            'повторно.'
+        )
+
+    def test_02_send_emails_batches(self, settings):
+        settings.EMAIL_USE_OUTBOX = True
+        EmailOutbox.objects.bulk_create(
+            EmailOutbox(
+                subject='YaMDb Confirmation Code',
+                message=f'Ваш проверочный код: {idx}',
+                from_email=settings.EMAIL_SENDER,
+                recipient=f'user{idx}@yamdb.fake',
+            )
+            for idx in range(25)
+        )
+        outbox_before_count = len(mail.outbox)
+
+        call_command('send_emails', batch_size=10, workers=3)
+        assert len(mail.outbox) == outbox_before_count + 25
+        assert not EmailOutbox.objects.filter(sent_at__isnull=True).exists()
+
+    def test_03_claimed_emails_skipped(self, settings):
+        settings.EMAIL_USE_OUTBOX = True
+        EmailOutbox.objects.bulk_create(
+            EmailOutbox(
+                subject='YaMDb Confirmation Code',
+                message=f'Ваш проверочный код: {idx}',
+                from_email=settings.EMAIL_SENDER,
+                recipient=f'user{idx}@yamdb.fake',
+            )
+            for idx in range(10)
+        )
+        _, first = claim_batch(0, 4)
+        _, second = claim_batch(0, 4)
+        assert len(first) == len(second) == 4
+        assert not {email.pk for email in first} & {
+            email.pk for email in second
+        }, (
+            'Проверьте, что письма, захваченные другим процессом, не '
+            'захватываются повторно.'
+        )
+        outbox_before_count = len(mail.outbox)
+
+        call_command('send_emails', batch_size=3)
+        assert len(mail.outbox) == outbox_before_count + 2, (
+            'Проверьте, что `send_emails` не отправляет письма, которые '
+            'отправляет другой процесс.'
+        )
+
+        EmailOutbox.objects.filter(sent_at__isnull=True).update(
+            claimed_until=timezone.now() - timedelta(seconds=1)
+        )
+        call_command('send_emails')
+        assert len(mail.outbox) == outbox_before_count + 10, (
+            'Проверьте, что письма упавшего процесса отправляются после '
+            'истечения захвата.'
+        )
+        assert not EmailOutbox.objects.exclude(claim=None).exists()
+
+    def test_04_server_down_retried_later(self, settings):
+        settings.EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+        settings.EMAIL_HOST = '127.0.0.1'
+        settings.EMAIL_PORT = 1
+        settings.EMAIL_TIMEOUT = 1
+        queued = EmailOutbox.objects.create(
+            subject='YaMDb Confirmation Code',
+            message='Ваш проверочный код: 1',
+            from_email=settings.EMAIL_SENDER,
+            recipient='user@yamdb.fake',
+        )
+
+        call_command('send_emails')
+        queued.refresh_from_db()
+        assert queued.attempts == 1 and queued.last_error, (
+            'Проверьте, что `send_emails` записывает попытку, если почтовый '
+            'сервер недоступен.'
+        )
+        assert queued.claim is None
+        assert queued.claimed_until > timezone.now(), (
+            'Проверьте, что неотправленное письмо повторяется не сразу.'
+        )
+
+        call_command('send_emails')
+        queued.refresh_from_db()
+        assert queued.attempts == 1
@@ -0,0 +1,150 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from users.authentication import token_version_cache, user_cache
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09AuthUserCache:
+
+    TITLES_URL = '/api/v1/titles/'
+    CATEGORIES_URL = '/api/v1/categories/'
+    USER_DETAIL_URL_TEMPLATE = '/api/v1/users/{username}/'
+    USERS_URL = '/api/v1/users/'
+    TOKEN_URL = '/api/v1/auth/token/'
+
+    def test_01_cached_user_skips_query(self, user_client, settings):
+        settings.RESPONSE_CACHE = None
+        with CaptureQueriesContext(connection) as first:
+            user_client.get(self.TITLES_URL)
+        with CaptureQueriesContext(connection) as second:
+            response = user_client.get(self.TITLES_URL)
+        assert response.status_code == HTTPStatus.OK
+        assert len(second) == len(first) - 1, (
+            'Проверьте, что повторный запрос с тем же токеном не загружает '
+            'пользователя из базы данных.'
+        )
+
+    def test_02_role_change_invalidates_cache(self, user_client, user,
+                                              admin_client):
+        data = {'name': 'Фильм', 'slug': 'films'}
+        response = user_client.post(self.CATEGORIES_URL, data=data)
+        assert response.status_code == HTTPStatus.FORBIDDEN
+
+        response = admin_client.patch(
+            self.USER_DETAIL_URL_TEMPLATE.format(username=user.username),
+            data={'role': 'admin'}
+        )
+        assert response.status_code == HTTPStatus.OK
+
+        response = user_client.post(self.CATEGORIES_URL, data=data)
+        assert response.status_code == HTTPStatus.CREATED, (
+            'Проверьте, что изменение роли пользователя сбрасывает его '
+            'запись в кеше аутентификации.'
+        )
+
+    def test_03_deleted_user_rejected(self, user_client, user, admin_client):
+        response = user_client.get(self.TITLES_URL)
+        assert response.status_code == HTTPStatus.OK
+
+        admin_client.delete(
+            self.USER_DETAIL_URL_TEMPLATE.format(username=user.username)
+        )
+        response = user_client.get(self.TITLES_URL)
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что токен удалённого пользователя перестаёт '
+            'действовать.'
+        )
+
+    def get_token_client(self, client, user):
+        user.confirmation_code = 'code'
+        user.save()
+        response = client.post(
+            self.TOKEN_URL,
+            data={'username': user.username, 'confirmation_code': 'code'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        token = response.json()['token']
+        token_client = APIClient()
+        token_client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return token_client, AccessToken(token)
+
+    def test_04_token_contains_role_claims(self, client, admin):
+        _, token = self.get_token_client(client, admin)
+        assert token['role'] == admin.role, (
+            'Проверьте, что токен содержит роль пользователя.'
+        )
+        assert token['is_staff'] is False
+        assert token['is_superuser'] is False
+        assert token['ver'] == admin.token_version
+
+    def test_05_role_change_revokes_token(self, client, admin, user,
+                                          admin_client):
+        token_client, _ = self.get_token_client(client, user)
+        response = token_client.get(self.TITLES_URL)
+        assert response.status_code == HTTPStatus.OK
+
+        response = admin_client.patch(
+            self.USER_DETAIL_URL_TEMPLATE.format(username=user.username),
+            data={'role': 'moderator'}
+        )
+        assert response.status_code == HTTPStatus.OK
+
+        response = token_client.get(self.TITLES_URL)
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что после смены роли выданные ранее токены '
+            'пользователя отзываются.'
+        )
+
+    def test_06_token_user_read_path(self, client, admin, settings,
+                                     django_assert_num_queries):
+        settings.AUTH_TOKEN_USER = True
+        token_client, _ = self.get_token_client(client, admin)
+        response = token_client.get(self.USERS_URL)
+        assert response.status_code == HTTPStatus.OK
+
+        with django_assert_num_queries(2):
+            response = token_client.get(self.USERS_URL)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что при чтении права администратора проверяются по '
+            'утверждениям токена без загрузки пользователя.'
+        )
+
+    def test_07_token_user_cold_cache(self, client, admin, user,
+                                      admin_client, settings):
+        settings.AUTH_TOKEN_USER = True
+        token_client, _ = self.get_token_client(client, admin)
+        user_table = user._meta.db_table
+
+        def user_queries():
+            with CaptureQueriesContext(connection) as context:
+                response = token_client.get(self.TITLES_URL)
+            return response, [
+                query for query in context.captured_queries
+                if user_table in query['sql']
+            ]
+
+        user_cache.clear()
+        token_version_cache.clear()
+        response, _ = user_queries()
+        assert response.status_code == HTTPStatus.OK
+        response, queries = user_queries()
+        assert response.status_code == HTTPStatus.OK
+        assert not queries, (
+            'Проверьте, что повторный запрос на чтение с включённой '
+            'настройкой `AUTH_TOKEN_USER` не загружает пользователя.'
+        )
+
+        admin.role = 'user'
+        admin.save()
+        user_cache.clear()
+        token_version_cache.clear()
+        response = token_client.get(self.USERS_URL)
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что отозванный токен отклоняется и после сброса '
+            'кеша версий токенов.'
+        )
@@ -0,0 +1,112 @@
+import json
+from http import HTTPStatus
+from pathlib import Path
+
+import pytest
+from django.core.management import call_command
+
+from api.management.commands.replay import read_log, read_postman
+
+from .conftest import BASE_DIR
+
+COLLECTION = Path(BASE_DIR).joinpath(
+    'postman_collection', 'Ymdb-collection.postman_collection.json'
+)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10Replay:
+
+    def test_01_read_postman_collection(self):
+        steps, variables = read_postman(COLLECTION)
+        assert len(steps) == 231, (
+            'Проверьте, что из коллекции читаются все запросы, включая '
+            'вложенные папки.'
+        )
+        assert all(step.expected for step in steps), (
+            'Проверьте, что ожидаемый статус берётся из тестов коллекции.'
+        )
+        token_step = next(
+            step for step in steps
+            if step.name.endswith('get_token_for_superuser')
+        )
+        assert token_step.captures == (('superuserToken', 'token'),)
+        assert token_step.expected == HTTPStatus.OK
+        assert variables['badSlug']
+
+    def test_02_read_log(self, tmp_path):
+        log = tmp_path.joinpath('requests.jsonl')
+        log.write_text(
+            '{"path": "/api/v1/titles/5/", "time": 10}\n\n'
+            '{"method": "post", "path": "/api/v1/auth/signup/", '
+            '"body": {"username": "me"}, "time": 12.5}\n'
+        )
+        first, second = read_log(log)
+        assert first.name == 'GET /api/v1/titles/{id}/'
+        assert first.offset == 0
+        assert second.method == 'POST'
+        assert second.offset == 2.5
+        assert dict(second.headers)['Content-Type'] == 'application/json'
+
+    def test_03_replay_log(self, live_server, tmp_path):
+        log = tmp_path.joinpath('requests.jsonl')
+        log.write_text('\n'.join(json.dumps(record) for record in (
+            {'method': 'GET', 'path': '/api/v1/titles/', 'time': 0},
+            {'method': 'GET', 'path': '/api/v1/titles/1/', 'status': 404,
+             'time': 0.01},
+            {'method': 'GET', 'path': '/api/v1/users/', 'status': 200,
+             'time': 0.02},
+        )))
+        output = tmp_path.joinpath('report.json')
+
+        call_command(
+            'replay', str(log), base_url=live_server.url, concurrency=2,
+            repeat=3, output=output
+        )
+        report = json.loads(output.read_text())
+        assert report['total']['requests'] == 9
+        assert report['results']['GET /api/v1/titles/{id}/']['errors'] == 0
+        assert report['results']['GET /api/v1/users/']['statuses'] == {
+            '401': 3
+        }, 'Проверьте, что replay учитывает статусы ответов.'
+        assert report['total']['error_rate'] == round(3 / 9, 4)
+
+    def test_04_replay_collection(self, live_server, django_user_model,
+                                  tmp_path):
+        # Те же пользователи, что создаёт postman_collection/set_up_data.sh.
+        django_user_model.objects.create_superuser(
+            username='superuser', email='superuser@admin.ru', password=None
+        )
+        django_user_model.objects.create_user(
+            username='admin-user', email='admin-user@admin.ru', role='admin'
+        )
+        django_user_model.objects.create_user(
+            username='moderator', email='moderator@admin.ru',
+            role='moderator'
+        )
+        output = tmp_path.joinpath('report.json')
+
+        call_command(
+            'replay', COLLECTION, base_url=live_server.url,
+            codes_from_db=True, max_error_rate=0, output=output
+        )
+        assert json.loads(output.read_text())['total']['requests'] == 231
+
+    def test_05_rate_counts_schedule_lag(self, live_server, tmp_path):
+        log = tmp_path.joinpath('requests.jsonl')
+        log.write_text(json.dumps({'path': '/api/v1/titles/'}))
+        output = tmp_path.joinpath('report.json')
+
+        call_command(
+            'replay', str(log), base_url=live_server.url, concurrency=1,
+            rate=10000, repeat=20, output=output
+        )
+        total = json.loads(output.read_text())['total']
+        assert total['lag_max_ms'] > 0, (
+            'Проверьте, что replay сообщает об отставании запросов от '
+            'расписания --rate.'
+        )
+        assert total['p99_ms'] >= total['lag_p99_ms'], (
+            'Проверьте, что при --rate время ответа отсчитывается от '
+            'запланированного времени отправки.'
+        )
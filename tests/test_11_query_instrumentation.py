@@ -0,0 +1,66 @@
+import json
+import logging
+from http import HTTPStatus
+
+import pytest
+
+from api.middleware import QueryBudgetExceeded, QueryStats
+from tests.utils import create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test11QueryInstrumentation:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def test_01_server_timing(self, admin_client, client):
+        create_titles(admin_client)
+        response = client.get(self.TITLES_URL)
+        server_timing = response.get('Server-Timing', '')
+        assert server_timing.startswith('db;dur='), (
+            'Проверьте, что ответ содержит заголовок `Server-Timing` со '
+            'временем выполнения SQL-запросов.'
+        )
+        assert 'queries' in server_timing and 'app;dur=' in server_timing
+
+    def test_02_budget_logged(self, admin_client, client, settings, caplog):
+        create_titles(admin_client)
+        settings.SQL_QUERY_BUDGETS = {'TitleViewSet': 1}
+        with caplog.at_level(logging.WARNING, logger='api.middleware'):
+            response = client.get(self.TITLES_URL)
+        assert response.status_code == HTTPStatus.OK
+        records = [json.loads(record.message) for record in caplog.records]
+        assert len(records) == 1, (
+            'Проверьте, что превышение бюджета SQL-запросов пишется в лог.'
+        )
+        assert records[0]['endpoint'] == 'TitleViewSet.list'
+        assert records[0]['budget'] == 1
+        assert records[0]['queries'] > 1
+
+    def test_03_budget_raises(self, admin_client, client, settings):
+        create_titles(admin_client)
+        settings.SQL_QUERY_BUDGETS = {'TitleViewSet.retrieve': 0}
+        settings.SQL_QUERY_BUDGET_RAISE = True
+        title_id = client.get(self.TITLES_URL).json()['results'][0]['id']
+        with pytest.raises(QueryBudgetExceeded):
+            client.get(f'{self.TITLES_URL}{title_id}/')
+
+    def test_04_duplicates(self):
+        stats = QueryStats()
+
+        def execute(sql, params, many, context):
+            return None
+
+        for sql in (
+            'SELECT * FROM genre WHERE id IN (%s, %s)',
+            'SELECT * FROM genre WHERE id IN (%s, %s, %s)',
+            'SELECT * FROM title WHERE id = %s',
+        ):
+            stats(execute, sql, (), False, {})
+        assert stats.count == 3
+        assert stats.duplicates() == {
+            'SELECT * FROM genre WHERE id IN (%s...)': 2
+        }, (
+            'Проверьте, что запросы, отличающиеся только длиной списка IN, '
+            'считаются повторами.'
+        )
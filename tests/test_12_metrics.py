@@ -0,0 +1,137 @@
+import gc
+import re
+import threading
+from http import HTTPStatus
+
+import pytest
+
+from api_yamdb.metrics import Counter, Histogram
+from users.models import EmailOutbox
+
+
+def get_sample(text, name, labels=''):
+    match = re.search(
+        rf'^{re.escape(name + labels)} (\S+)$', text, re.MULTILINE
+    )
+    assert match, f'В выгрузке метрик не найдена строка `{name}{labels}`.'
+    return float(match.group(1))
+
+
+@pytest.mark.django_db(transaction=True)
+class Test12Metrics:
+
+    METRICS_URL = '/metrics/'
+
+    def test_01_histogram_threads(self):
+        histogram = Histogram('test_seconds', 'Test.', ('view',), (0.1, 1))
+
+        def observe():
+            for _ in range(1000):
+                histogram.observe(0.05, 'list')
+                histogram.observe(5, 'list')
+
+        threads = [threading.Thread(target=observe) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        text = '\n'.join(histogram.render())
+        assert get_sample(
+            text, 'test_seconds_bucket', '{view="list",le="0.1"}'
+        ) == 4000
+        assert get_sample(
+            text, 'test_seconds_bucket', '{view="list",le="+Inf"}'
+        ) == 8000, (
+            'Проверьте, что наблюдения из всех потоков складываются.'
+        )
+        assert get_sample(text, 'test_seconds_count', '{view="list"}') == 8000
+        assert get_sample(
+            text, 'test_seconds_sum', '{view="list"}'
+        ) == pytest.approx(20200)
+
+    def test_02_counter_labels_escaped(self):
+        counter = Counter('test_total', 'Test.', ('path',))
+        counter.inc('a"b')
+        counter.inc('a"b', amount=2)
+        assert counter.value('a"b') == 3
+        assert 'test_total{path="a\\"b"} 3' in counter.render()
+
+    def test_03_metrics_endpoint(self, client, user_client, settings):
+        settings.METRICS_ENABLED = True
+        EmailOutbox.objects.create(
+            subject='YaMDb Confirmation Code',
+            message='Ваш проверочный код: 1',
+            from_email='yambd@yandex.ru',
+            recipient='user@yamdb.fake',
+        )
+        client.get('/api/v1/titles/')
+        user_client.get('/api/v1/titles/')
+        user_client.get('/api/v1/titles/')
+
+        response = client.get(self.METRICS_URL)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Эндпоинт `{self.METRICS_URL}` должен отдавать метрики.'
+        )
+        assert response['Content-Type'].startswith('text/plain')
+        text = response.content.decode()
+        assert get_sample(
+            text, 'yamdb_request_duration_seconds_count',
+            '{endpoint="TitleViewSet.list",method="GET"}'
+        ) >= 3
+        assert get_sample(
+            text, 'yamdb_responses_total',
+            '{endpoint="TitleViewSet.list",status="200"}'
+        ) >= 3
+        assert get_sample(
+            text, 'yamdb_request_db_queries_count',
+            '{endpoint="TitleViewSet.list"}'
+        ) >= 3
+        assert get_sample(
+            text, 'yamdb_cache_requests_total',
+            '{cache="auth_user",result="hit"}'
+        ) >= 1, 'Проверьте, что попадания в кеш пользователей учитываются.'
+        assert get_sample(text, 'yamdb_email_outbox_pending') == 1
+
+    def test_04_metrics_protected(self, client, admin_client, settings):
+        response = client.get(self.METRICS_URL)
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            f'Эндпоинт `{self.METRICS_URL}` должен быть выключен по '
+            'умолчанию.'
+        )
+
+        settings.METRICS_ENABLED = True
+        settings.METRICS_TOKEN = 'scraper-token'
+        for request_client in (client, admin_client):
+            response = request_client.get(self.METRICS_URL)
+            assert response.status_code == HTTPStatus.FORBIDDEN, (
+                'Проверьте, что при заданном METRICS_TOKEN метрики не '
+                'отдаются запросам без токена.'
+            )
+        response = client.get(
+            self.METRICS_URL, HTTP_AUTHORIZATION='Bearer scraper-token'
+        )
+        assert response.status_code == HTTPStatus.OK
+
+    def test_05_exited_threads_folded(self):
+        counter = Counter('test_total', 'Test.', ('view',))
+        histogram = Histogram('test_seconds', 'Test.', ('view',), (0.1, 1))
+
+        def observe():
+            counter.inc('list')
+            histogram.observe(0.5, 'list')
+
+        for _ in range(200):
+            thread = threading.Thread(target=observe)
+            thread.start()
+            thread.join()
+        del thread
+        gc.collect()
+        assert len(counter._shards) <= 1 and len(histogram._shards) <= 1, (
+            'Проверьте, что счётчики завершившихся потоков не накапливаются.'
+        )
+        assert counter.value('list') == 200, (
+            'Проверьте, что счётчики завершившихся потоков сохраняются в '
+            'итоге.'
+        )
+        assert histogram.merged()[('list',)] == [0, 200, 0, 100]
@@ -0,0 +1,103 @@
+import time
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from api.views import TitleViewSet
+from django.core.management import call_command
+from django.db import connection
+from reviews.models import Category
+
+from tests.utils import create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test13Profiling:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def test_01_disabled_by_default(self, client, settings, tmp_path):
+        settings.PROFILING_DIR = tmp_path
+        response = client.get(self.TITLES_URL)
+        assert response.status_code == HTTPStatus.OK
+        assert not any(tmp_path.iterdir()), (
+            'Профилирование запросов должно быть выключено по умолчанию.'
+        )
+
+    def test_02_sampled_cprofile(self, admin_client, client, settings,
+                                 tmp_path):
+        create_titles(admin_client)
+        settings.PROFILING_DIR = tmp_path
+        settings.PROFILING_SAMPLE_RATE = 1
+        response = client.get(self.TITLES_URL)
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['count'] == 2
+        client.get('/redoc/')
+
+        assert [path.name for path in tmp_path.iterdir()] == [
+            'TitleViewSet.list'
+        ], (
+            'Проверьте, что профили сохраняются по маршруту и только для '
+            'вьюсетов DRF.'
+        )
+        profiles = list(tmp_path.joinpath('TitleViewSet.list').iterdir())
+        assert len(profiles) == 1
+        assert profiles[0].suffix == '.prof'
+
+        output = StringIO()
+        call_command(
+            'profile_hotspots', path=tmp_path, limit=5, stdout=output
+        )
+        assert 'TitleViewSet.list: 1 cProfile Profile(s)' in (
+            output.getvalue()
+        )
+
+    def test_03_slow_requests_sampled(self, client, settings, tmp_path,
+                                      monkeypatch):
+        settings.PROFILING_DIR = tmp_path
+        settings.PROFILING_SLOW_THRESHOLD = 0
+        settings.PROFILING_INTERVAL = 0.0005
+        # Пустой список отдаётся быстрее интервала переключения GIL, и поток
+        # снятия стеков может не успеть проснуться; sleep отпускает GIL.
+        list_view = TitleViewSet.list
+
+        def slow_list(*args, **kwargs):
+            time.sleep(0.01)
+            return list_view(*args, **kwargs)
+
+        monkeypatch.setattr(TitleViewSet, 'list', slow_list)
+        for _ in range(5):
+            client.get(self.TITLES_URL)
+        stacks = list(tmp_path.joinpath('TitleViewSet.list').iterdir())
+        assert stacks, (
+            'Проверьте, что для медленных запросов сохраняются стеки.'
+        )
+        assert all(path.suffix == '.folded' for path in stacks)
+
+        output = StringIO()
+        call_command(
+            'profile_hotspots', path=tmp_path, merge=True, stdout=output
+        )
+        assert 'all routes:' in output.getvalue()
+        assert 'Stack Samples' in output.getvalue()
+
+    def test_04_profiled_requests_atomic(self, client, settings, tmp_path,
+                                         monkeypatch):
+        settings.PROFILING_DIR = tmp_path
+        settings.PROFILING_SAMPLE_RATE = 1
+        monkeypatch.setitem(connection.settings_dict, 'ATOMIC_REQUESTS', True)
+
+        def failing_list(*args, **kwargs):
+            Category.objects.create(name='Черновик', slug='draft')
+            raise RuntimeError('Сбой после записи')
+
+        monkeypatch.setattr(TitleViewSet, 'list', failing_list)
+        with pytest.raises(RuntimeError):
+            client.get(self.TITLES_URL)
+        assert not Category.objects.exists(), (
+            'Проверьте, что профилируемый запрос выполняется в транзакции '
+            'ATOMIC_REQUESTS, как и остальные.'
+        )
+        assert list(tmp_path.joinpath('TitleViewSet.list').iterdir()), (
+            'Проверьте, что профиль сохраняется и для запроса с ошибкой.'
+        )
@@ -0,0 +1,85 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test14ResponseCache:
+
+    TITLES_URL = '/api/v1/titles/'
+    TITLE_DETAIL_URL_TEMPLATE = '/api/v1/titles/{title_id}/'
+    CATEGORIES_URL = '/api/v1/categories/'
+    GENRES_URL = '/api/v1/genres/'
+
+    @pytest.fixture(autouse=True)
+    def response_cache(self, settings):
+        settings.RESPONSE_CACHE = 'default'
+
+    def test_01_cached_without_queries(self, admin_client, client):
+        titles, _, _ = create_titles(admin_client)
+        for url in (
+            self.TITLES_URL,
+            f'{self.TITLES_URL}?year=1984',
+            self.TITLE_DETAIL_URL_TEMPLATE.format(title_id=titles[0]['id']),
+            self.CATEGORIES_URL,
+            self.GENRES_URL,
+        ):
+            first = client.get(url)
+            with CaptureQueriesContext(connection) as captured:
+                second = client.get(url)
+            assert second.status_code == HTTPStatus.OK
+            assert second.json() == first.json()
+            assert len(captured) == 0, (
+                f'Проверьте, что повторный GET-запрос к `{url}` отдаётся из '
+                'кеша без обращений к базе данных.'
+            )
+
+    def test_02_query_string_in_key(self, admin_client, client):
+        create_titles(admin_client)
+        assert client.get(self.TITLES_URL).json()['count'] == 2
+        response = client.get(f'{self.TITLES_URL}?year=1984')
+        assert response.json()['count'] == 1, (
+            'Проверьте, что параметры запроса входят в ключ кеша.'
+        )
+        response = client.get(f'{self.TITLES_URL}?genre=drama')
+        assert response.json()['count'] == 1
+
+    def test_03_writes_invalidate(self, admin_client, client, user_client):
+        titles, categories, _ = create_titles(admin_client)
+        title_url = self.TITLE_DETAIL_URL_TEMPLATE.format(
+            title_id=titles[0]['id']
+        )
+        assert client.get(title_url).json()['rating'] is None
+
+        create_single_review(user_client, titles[0]['id'], 'Отзыв', 7)
+        assert client.get(title_url).json()['rating'] == 7, (
+            'Проверьте, что новый отзыв сбрасывает закешированные '
+            'ответы произведений.'
+        )
+
+        response = admin_client.patch(title_url, data={'genre': ['drama']})
+        assert response.status_code == HTTPStatus.OK
+        genres = client.get(title_url).json()['genre']
+        assert [genre['slug'] for genre in genres] == ['drama'], (
+            'Проверьте, что изменение жанров произведения сбрасывает кеш.'
+        )
+
+        assert client.get(self.CATEGORIES_URL).json()['count'] == 2
+        admin_client.delete(f'{self.CATEGORIES_URL}{categories[0]["slug"]}/')
+        assert client.get(self.CATEGORIES_URL).json()['count'] == 1
+        assert client.get(title_url).json()['category'] is None, (
+            'Проверьте, что удаление категории сбрасывает закешированные '
+            'ответы произведений.'
+        )
+
+    def test_04_cache_disabled(self, admin_client, client, settings):
+        create_titles(admin_client)
+        settings.RESPONSE_CACHE = None
+        client.get(self.TITLES_URL)
+        with CaptureQueriesContext(connection) as captured:
+            client.get(self.TITLES_URL)
+        assert len(captured) > 0
@@ -0,0 +1,271 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from users.models import CustomUser
+
+from tests.utils import (create_single_comment, create_single_review,
+                         create_titles)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test15ConditionalGet:
+
+    TITLES_URL = '/api/v1/titles/'
+    TITLE_DETAIL_URL_TEMPLATE = '/api/v1/titles/{title_id}/'
+    REVIEWS_URL_TEMPLATE = '/api/v1/titles/{title_id}/reviews/'
+    REVIEW_DETAIL_URL_TEMPLATE = (
+        '/api/v1/titles/{title_id}/reviews/{review_id}/'
+    )
+    COMMENTS_URL_TEMPLATE = (
+        '/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+    )
+    POLLS = 20
+
+    def poll(self, client, url, conditional):
+        """Опрашивает url и возвращает суммарный размер тел ответов."""
+        etag = None
+        size = 0
+        for _ in range(self.POLLS):
+            headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+            response = client.get(url, **headers)
+            assert response.status_code in (
+                HTTPStatus.OK, HTTPStatus.NOT_MODIFIED
+            )
+            size += len(response.content)
+            if conditional:
+                etag = response['ETag']
+        return size
+
+    def test_01_polling_bytes_saved(self, admin_client, client, user_client,
+                                    moderator_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        review_id = None
+        for author_client in (user_client, moderator_client, admin_client):
+            review_id = create_single_review(
+                author_client, title_id, 'Отзыв ' * 50, 5
+            ).json()['id']
+        create_single_comment(user_client, title_id, review_id, 'Комментарий')
+
+        for url in (
+            self.REVIEWS_URL_TEMPLATE.format(title_id=title_id),
+            self.REVIEW_DETAIL_URL_TEMPLATE.format(
+                title_id=title_id, review_id=review_id
+            ),
+            self.COMMENTS_URL_TEMPLATE.format(
+                title_id=title_id, review_id=review_id
+            ),
+        ):
+            plain = self.poll(client, url, conditional=False)
+            conditional = self.poll(client, url, conditional=True)
+            assert conditional * 10 < plain, (
+                f'Проверьте, что повторные GET-запросы к `{url}` с заголовком '
+                'If-None-Match получают ответ 304 без тела.'
+            )
+
+    def test_02_not_modified_without_serialization(self, admin_client,
+                                                   client, user_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        create_single_review(user_client, title_id, 'Отзыв', 5)
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=title_id)
+        etag = client.get(url)['ETag']
+
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+        assert response['ETag'] == etag
+        assert len(captured) == 1, (
+            'Проверьте, что версия списка отзывов вычисляется одним запросом '
+            'и ответ 304 не выбирает сами отзывы.'
+        )
+
+        response = client.get(f'{url}?page=1', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что параметры запроса входят в ETag.'
+        )
+
+    def test_03_changes_invalidate(self, admin_client, client, user_client,
+                                   moderator_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=title_id)
+        etags = [client.get(url)['ETag']]
+
+        review_id = create_single_review(
+            user_client, title_id, 'Отзыв', 5
+        ).json()['id']
+        etags.append(client.get(url)['ETag'])
+        detail_url = self.REVIEW_DETAIL_URL_TEMPLATE.format(
+            title_id=title_id, review_id=review_id
+        )
+        detail_etag = client.get(detail_url)['ETag']
+
+        response = user_client.patch(detail_url, data={'text': 'Правка'})
+        assert response.status_code == HTTPStatus.OK
+        etags.append(client.get(url)['ETag'])
+        response = client.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что изменение отзыва меняет его ETag.'
+        )
+        assert response.json()['text'] == 'Правка'
+
+        create_single_review(moderator_client, title_id, 'Отзыв', 5)
+        etags.append(client.get(url)['ETag'])
+        response = user_client.patch(
+            '/api/v1/users/me/', data={'username': 'renamed'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        etags.append(client.get(url)['ETag'])
+        response = moderator_client.delete(detail_url)
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        etags.append(client.get(url)['ETag'])
+
+        assert len(set(etags)) == len(etags), (
+            'Проверьте, что создание, изменение и удаление отзывов, а также '
+            'смена имени автора меняют ETag списка отзывов.'
+        )
+        response = client.get(url, HTTP_IF_NONE_MATCH=etags[-2])
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['count'] == 1
+
+    def test_04_missing_objects(self, admin_client, client):
+        titles, _, _ = create_titles(admin_client)
+        for review_id in (999, 'abc'):
+            response = client.get(
+                self.REVIEW_DETAIL_URL_TEMPLATE.format(
+                    title_id=titles[0]['id'], review_id=review_id
+                ),
+                HTTP_IF_NONE_MATCH='*'
+            )
+            assert response.status_code == HTTPStatus.NOT_FOUND, (
+                'Проверьте, что для несуществующих объектов ответ 304 не '
+                'возвращается.'
+            )
+            assert not response.has_header('ETag')
+
+    def test_05_deferred_username_not_loaded(self, user, admin, moderator,
+                                             django_assert_num_queries):
+        with django_assert_num_queries(1):
+            users = list(CustomUser.objects.only('id')[:50])
+        assert len(users) == 3, (
+            'Проверьте, что загрузка пользователей без поля username не '
+            'запрашивает его для каждого пользователя отдельно.'
+        )
+
+    def test_06_cursor_pages_not_counted(self, admin_client, client,
+                                         user_client, moderator_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        review_id = create_single_review(
+            user_client, title_id, 'Отзыв', 5
+        ).json()['id']
+        create_single_review(moderator_client, title_id, 'Отзыв', 5)
+        url = (
+            f'{self.REVIEWS_URL_TEMPLATE.format(title_id=title_id)}'
+            '?pagination=cursor'
+        )
+
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        assert len(response.json()['results']) == 2
+        assert not [
+            query for query in captured if 'COUNT(' in query['sql']
+        ], (
+            'Проверьте, что в курсорном режиме ETag списка отзывов '
+            'вычисляется без подсчёта всех отзывов.'
+        )
+        assert len(captured) == 1
+        etag = response['ETag']
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+        response = user_client.patch(
+            self.REVIEW_DETAIL_URL_TEMPLATE.format(
+                title_id=title_id, review_id=review_id
+            ),
+            data={'text': 'Правка'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что изменение отзыва на странице меняет ETag '
+            'в курсорном режиме.'
+        )
+        etag = response['ETag']
+        response = user_client.delete(
+            self.REVIEW_DETAIL_URL_TEMPLATE.format(
+                title_id=title_id, review_id=review_id
+            )
+        )
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK
+        assert len(response.json()['results']) == 1
+
+    def get_title_etags(self, client, title_id):
+        return (
+            client.get(self.TITLES_URL)['ETag'],
+            client.get(
+                self.TITLE_DETAIL_URL_TEMPLATE.format(title_id=title_id)
+            )['ETag'],
+        )
+
+    def test_07_title_changes_invalidate(self, admin_client, client,
+                                         user_client):
+        titles, categories, genres = create_titles(admin_client)
+        title_id = titles[0]['id']
+        detail_url = self.TITLE_DETAIL_URL_TEMPLATE.format(title_id=title_id)
+        etags = [self.get_title_etags(client, title_id)]
+        response = client.get(detail_url, HTTP_IF_NONE_MATCH=etags[0][1])
+        assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+            'Проверьте, что произведения поддерживают условные GET-запросы.'
+        )
+
+        create_single_review(user_client, title_id, 'Отзыв', 7)
+        etags.append(self.get_title_etags(client, title_id))
+        response = admin_client.patch(
+            detail_url, data={'genre': [genres[2]['slug']]}
+        )
+        assert response.status_code == HTTPStatus.OK
+        etags.append(self.get_title_etags(client, title_id))
+        response = admin_client.delete(
+            f'/api/v1/genres/{genres[2]["slug"]}/'
+        )
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        etags.append(self.get_title_etags(client, title_id))
+        response = admin_client.delete(
+            f'/api/v1/categories/{categories[0]["slug"]}/'
+        )
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        etags.append(self.get_title_etags(client, title_id))
+
+        for etag, next_etag in zip(etags, etags[1:]):
+            assert etag[0] != next_etag[0] and etag[1] != next_etag[1], (
+                'Проверьте, что изменение рейтинга, жанров и категории '
+                'произведения меняет ETag произведения и их списка.'
+            )
+        response = client.get(detail_url, HTTP_IF_NONE_MATCH=etags[-1][1])
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+    def test_08_cached_titles_not_modified(self, admin_client, client,
+                                           settings):
+        settings.RESPONSE_CACHE = 'default'
+        titles, _, _ = create_titles(admin_client)
+        for url in (
+            self.TITLES_URL,
+            self.TITLE_DETAIL_URL_TEMPLATE.format(title_id=titles[0]['id']),
+        ):
+            etag = client.get(url)['ETag']
+            with CaptureQueriesContext(connection) as captured:
+                response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == HTTPStatus.NOT_MODIFIED
+            assert len(captured) == 0, (
+                'Проверьте, что закешированный ответ получает ETag без '
+                'обращений к базе данных.'
+            )
+            response = client.get(url)
+            assert response['ETag'] == etag
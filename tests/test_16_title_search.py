@@ -0,0 +1,156 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import Title
+from reviews.search import memory_index
+
+from tests.utils import create_titles
+
+BACKENDS = ('fts5', 'memory')
+
+
+@pytest.mark.django_db(transaction=True)
+class Test16TitleSearch:
+
+    TITLES_URL = '/api/v1/titles/'
+    TITLES_DETAIL_URL_TEMPLATE = '/api/v1/titles/{title_id}/'
+
+    def create_title(self, admin_client, categories, genres, name,
+                     description):
+        response = admin_client.post(self.TITLES_URL, data={
+            'name': name,
+            'year': 2000,
+            'genre': [genres[0]['slug']],
+            'category': categories[0]['slug'],
+            'description': description,
+        })
+        assert response.status_code == HTTPStatus.CREATED
+        return response.json()['id']
+
+    def search(self, client, query):
+        response = client.get(self.TITLES_URL, {'search': query})
+        assert response.status_code == HTTPStatus.OK
+        return [title['name'] for title in response.json()['results']]
+
+    @pytest.mark.parametrize('backend', BACKENDS)
+    def test_01_prefix_and_terms(self, admin_client, client, settings,
+                                 backend):
+        settings.TITLE_SEARCH_BACKEND = backend
+        _, categories, genres = create_titles(admin_client)
+        self.create_title(
+            admin_client, categories, genres, 'Терминатор 2: Судный день',
+            'Киборг защищает Джона Коннора.'
+        )
+
+        assert self.search(client, 'термин') == [
+            'Терминатор', 'Терминатор 2: Судный день'
+        ], 'Проверьте, что слова запроса ищутся по префиксу.'
+        assert self.search(client, 'ТЕРМИНАТОР судн') == [
+            'Терминатор 2: Судный день'
+        ], 'Проверьте, что все слова запроса должны найтись в произведении.'
+        assert self.search(client, 'yippie') == ['Крепкий орешек'], (
+            'Проверьте, что поиск идёт и по описанию.'
+        )
+        assert self.search(client, 'коннор') == [
+            'Терминатор 2: Судный день'
+        ]
+        assert self.search(client, 'матрица') == []
+        assert self.search(client, '"*:)') == [], (
+            'Проверьте, что запрос без слов ничего не находит и не '
+            'приводит к ошибке.'
+        )
+
+    @pytest.mark.parametrize('backend', BACKENDS)
+    def test_02_ranking(self, admin_client, client, settings, backend):
+        settings.TITLE_SEARCH_BACKEND = backend
+        _, categories, genres = create_titles(admin_client)
+        self.create_title(
+            admin_client, categories, genres, 'Алиен',
+            'Экипаж находит на планете корабль пришельцев.'
+        )
+        self.create_title(
+            admin_client, categories, genres, 'Пришельцы',
+            'Рыцарь попадает в будущее.'
+        )
+        assert self.search(client, 'пришельц') == ['Пришельцы', 'Алиен'], (
+            'Проверьте, что совпадения в названии ранжируются выше '
+            'совпадений в описании.'
+        )
+
+    @pytest.mark.parametrize('backend', BACKENDS)
+    def test_03_index_follows_changes(self, admin_client, client, settings,
+                                      backend):
+        settings.TITLE_SEARCH_BACKEND = backend
+        titles, _, _ = create_titles(admin_client)
+        assert self.search(client, 'орешек') == ['Крепкий орешек']
+
+        title_url = self.TITLES_DETAIL_URL_TEMPLATE.format(
+            title_id=titles[1]['id']
+        )
+        response = admin_client.patch(title_url, data={'name': 'Die Hard'})
+        assert response.status_code == HTTPStatus.OK
+        assert self.search(client, 'орешек') == []
+        assert self.search(client, 'die hard') == ['Die Hard'], (
+            'Проверьте, что индекс обновляется при изменении произведения.'
+        )
+
+        response = admin_client.delete(title_url)
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert self.search(client, 'die') == [], (
+            'Проверьте, что удалённые произведения не находятся.'
+        )
+
+    def test_04_combined_with_filters(self, admin_client, client):
+        titles, _, _ = create_titles(admin_client)
+        response = client.get(
+            self.TITLES_URL, {'search': 'термин', 'year': 1988}
+        )
+        assert response.json()['count'] == 0
+        response = client.get(
+            self.TITLES_URL, {'search': 'термин', 'year': 1984}
+        )
+        assert response.json()['count'] == 1
+        assert response.json()['results'][0]['id'] == titles[0]['id']
+
+    @pytest.mark.parametrize('backend', BACKENDS)
+    def test_05_all_matches_ranked(self, client, settings, backend):
+        settings.TITLE_SEARCH_BACKEND = backend
+        Title.objects.bulk_create(
+            Title(name=f'Дубль {index}', description='Текст.', year=2000)
+            for index in range(1042)
+        )
+        Title.objects.create(
+            name='Дубль дубль', description='Текст.', year=2000
+        )
+        memory_index.reset()
+
+        response = client.get(self.TITLES_URL, {'search': 'дубль'})
+        assert response.json()['count'] == 1043, (
+            'Проверьте, что поиск находит все совпадения, а не только '
+            'лучшие.'
+        )
+        assert response.json()['results'][0]['name'] == 'Дубль дубль'
+        response = client.get(
+            self.TITLES_URL, {'search': 'дубль', 'page': 105}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert len(response.json()['results']) == 3
+
+    def test_06_search_query_budget(self, admin_client, client, settings):
+        settings.TITLE_SEARCH_BACKEND = None
+        settings.SQL_QUERY_BUDGET_RAISE = True
+        create_titles(admin_client)
+        self.search(client, 'термин')
+        with CaptureQueriesContext(connection) as context:
+            self.search(client, 'термин')
+        assert len(context) <= settings.SQL_QUERY_BUDGETS[
+            'TitleViewSet.list'
+        ]
+        assert not [
+            query for query in context.captured_queries
+            if 'sqlite_master' in query['sql']
+        ], (
+            'Проверьте, что поиск не проверяет схему базы на каждый запрос.'
+        )
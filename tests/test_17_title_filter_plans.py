@@ -0,0 +1,55 @@
+from http import HTTPStatus
+from itertools import combinations
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.utils import create_titles
+
+FILTERS = {'genre': 'horror', 'category': 'films', 'year': 1984}
+FILTER_COMBINATIONS = [
+    combination
+    for size in range(1, len(FILTERS) + 1)
+    for combination in combinations(FILTERS, size)
+]
+
+
+def get_plan(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test17TitleFilterPlans:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    @pytest.mark.parametrize(
+        'combination', FILTER_COMBINATIONS, ids='+'.join
+    )
+    def test_01_no_full_scans(self, admin_client, client, settings,
+                              combination):
+        if connection.vendor != 'sqlite':
+            pytest.skip('Планы запросов проверяются только на SQLite.')
+        settings.RESPONSE_CACHE = None
+        create_titles(admin_client)
+        params = {name: FILTERS[name] for name in combination}
+
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(self.TITLES_URL, params)
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['count'] == 1
+        assert len(captured) > 0
+
+        for query in captured:
+            scans = [
+                step for step in get_plan(query['sql'])
+                if step.startswith('SCAN ')
+            ]
+            assert not scans, (
+                f'Запрос к `{self.TITLES_URL}` с фильтрами {params} читает '
+                f'таблицу целиком ({scans}). Проверьте индексы под '
+                f'фильтры и сортировку по названию:\n{query["sql"]}'
+            )
@@ -0,0 +1,100 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.utils import create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test18TitleFacets:
+
+    TITLES_URL = '/api/v1/titles/'
+    FACETS_URL = '/api/v1/titles/facets/'
+
+    def get_facets(self, client, params=None):
+        response = client.get(self.FACETS_URL, params or {})
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что GET-запрос к `{self.FACETS_URL}` возвращает '
+            'ответ со статусом 200.'
+        )
+        return response.json()
+
+    @staticmethod
+    def counts(facet):
+        return {
+            row.get('slug', row.get('from')): row['count'] for row in facet
+        }
+
+    def get_title_id(self, client):
+        return client.get(self.TITLES_URL, {'year': 1984}).json()[
+            'results'
+        ][0]['id']
+
+    def test_01_counts(self, admin_client, client):
+        create_titles(admin_client)
+        facets = self.get_facets(client)
+        assert facets['count'] == 2
+        assert self.counts(facets['genre']) == {
+            'horror': 1, 'comedy': 1, 'drama': 1
+        }
+        assert self.counts(facets['category']) == {'films': 1, 'books': 1}
+        assert facets['year'] == [
+            {'from': 1980, 'to': 1989, 'count': 2}
+        ], 'Проверьте, что годы группируются по десятилетиям.'
+        assert facets['genre'][0]['name'] in ('Ужасы', 'Комедия', 'Драма')
+
+    def test_02_filters(self, admin_client, client):
+        create_titles(admin_client)
+        facets = self.get_facets(client, {'genre': 'drama'})
+        assert facets['count'] == 1
+        assert self.counts(facets['genre']) == {
+            'horror': 1, 'comedy': 1, 'drama': 1
+        }, (
+            'Проверьте, что счётчики по жанрам не учитывают выбранный жанр, '
+            'чтобы можно было показать другие варианты.'
+        )
+        assert self.counts(facets['category']) == {'books': 1}, (
+            'Проверьте, что остальные счётчики учитывают выбранный жанр.'
+        )
+
+        facets = self.get_facets(client, {'search': 'термин', 'year': 1988})
+        assert facets['count'] == 0
+        assert self.counts(facets['year']) == {1980: 1}
+        assert self.counts(facets['genre']) == {}
+
+    def test_03_cached_by_signature(self, admin_client, client, settings):
+        settings.RESPONSE_CACHE = 'default'
+        create_titles(admin_client)
+        with CaptureQueriesContext(connection) as captured:
+            first = self.get_facets(
+                client, {'year': 1984, 'category': 'films'}
+            )
+        assert len(captured) <= 6, (
+            'Проверьте, что счётчики считаются фиксированным числом '
+            'агрегирующих запросов.'
+        )
+        with CaptureQueriesContext(connection) as captured:
+            second = self.get_facets(
+                client, {'category': 'films', 'year': '1984', 'page': 2}
+            )
+        assert second == first
+        assert len(captured) == 0, (
+            'Проверьте, что счётчики кешируются по значениям фильтров, '
+            'независимо от их порядка и параметров пагинации.'
+        )
+
+        response = admin_client.patch(
+            f'{self.TITLES_URL}{self.get_title_id(client)}/',
+            data={'category': 'books'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        third = self.get_facets(client, {'year': 1984, 'category': 'films'})
+        assert third['count'] == 0, (
+            'Проверьте, что изменение произведений сбрасывает кеш счётчиков.'
+        )
+
+    def test_04_invalid_params(self, client):
+        response = client.get(self.FACETS_URL, {'year': 'abc'})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
@@ -0,0 +1,145 @@
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from api.cache import get_generations, get_response_cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import Review, Title
+
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test19TitleRating:
+
+    TITLE_DETAIL_URL_TEMPLATE = '/api/v1/titles/{title_id}/'
+    REVIEW_DETAIL_URL_TEMPLATE = (
+        '/api/v1/titles/{title_id}/reviews/{review_id}/'
+    )
+
+    @staticmethod
+    def get_rating(title_id):
+        return Title.objects.values_list(
+            'rating_sum', 'rating_count', 'rating'
+        ).get(pk=title_id)
+
+    def test_01_review_writes(self, admin_client, user_client,
+                              moderator_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        review_id = create_single_review(
+            user_client, title_id, 'Отзыв', 8
+        ).json()['id']
+        create_single_review(moderator_client, title_id, 'Отзыв', 3)
+        assert self.get_rating(title_id) == (11, 2, 5), (
+            'Проверьте, что новые отзывы учитываются в рейтинге произведения.'
+        )
+
+        review_url = self.REVIEW_DETAIL_URL_TEMPLATE.format(
+            title_id=title_id, review_id=review_id
+        )
+        response = user_client.patch(review_url, data={'score': 10})
+        assert response.status_code == HTTPStatus.OK
+        assert self.get_rating(title_id) == (13, 2, 6), (
+            'Проверьте, что изменение оценки пересчитывает рейтинг.'
+        )
+        response = user_client.patch(review_url, data={'text': 'Текст'})
+        assert response.status_code == HTTPStatus.OK
+        assert self.get_rating(title_id) == (13, 2, 6)
+
+        response = user_client.delete(review_url)
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert self.get_rating(title_id) == (3, 1, 3), (
+            'Проверьте, что удаление отзыва пересчитывает рейтинг.'
+        )
+        response = admin_client.get(
+            self.TITLE_DETAIL_URL_TEMPLATE.format(title_id=title_id)
+        )
+        assert response.json()['rating'] == 3
+
+    def test_02_cascade_delete(self, admin_client, user_client,
+                               moderator_client, user):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        create_single_review(user_client, title_id, 'Отзыв', 8)
+        create_single_review(moderator_client, title_id, 'Отзыв', 4)
+
+        response = admin_client.delete(f'/api/v1/users/{user.username}/')
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert self.get_rating(title_id) == (4, 1, 4), (
+            'Проверьте, что рейтинг пересчитывается, когда отзывы удаляются '
+            'вместе с автором.'
+        )
+        Review.objects.all().delete()
+        assert self.get_rating(title_id) == (0, 0, None)
+
+    @staticmethod
+    def count_rating_updates(captured):
+        return sum(
+            query['sql'].startswith('UPDATE "reviews_title"')
+            for query in captured
+        )
+
+    def test_03_cascade_updates_batched(self, admin_client, user_client,
+                                        moderator_client, user):
+        titles, _, _ = create_titles(admin_client)
+        for title in titles:
+            create_single_review(user_client, title['id'], 'Отзыв', 8)
+            create_single_review(moderator_client, title['id'], 'Отзыв', 2)
+
+        with CaptureQueriesContext(connection) as captured:
+            response = admin_client.delete(f'/api/v1/users/{user.username}/')
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert self.count_rating_updates(captured) == 1, (
+            'Проверьте, что оценки удаляемого автора вычитаются из рейтингов '
+            'одним запросом, а не по одному на отзыв.'
+        )
+        for title in titles:
+            assert self.get_rating(title['id']) == (2, 1, 2)
+
+        with CaptureQueriesContext(connection) as captured:
+            response = admin_client.delete(
+                self.TITLE_DETAIL_URL_TEMPLATE.format(title_id=titles[0]['id'])
+            )
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert self.count_rating_updates(captured) == 0, (
+            'Проверьте, что при удалении произведения его рейтинг не '
+            'пересчитывается для каждого удаляемого отзыва.'
+        )
+        assert self.get_rating(titles[1]['id']) == (2, 1, 2)
+        create_single_review(admin_client, titles[1]['id'], 'Отзыв', 6)
+        assert self.get_rating(titles[1]['id']) == (8, 2, 4)
+
+    def test_04_recalculate_ratings(self, admin_client, user_client,
+                                    settings):
+        settings.RESPONSE_CACHE = 'default'
+        cache = get_response_cache()
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        create_single_review(user_client, title_id, 'Отзыв', 7)
+        Review.objects.update(score=9)
+        Title.objects.filter(pk=titles[1]['id']).update(rating_count=5)
+
+        output = StringIO()
+        call_command('recalculate_ratings', dry_run=True, stdout=output)
+        assert 'Found 2 Title(s) with Drifted Ratings' in output.getvalue(), (
+            'Проверьте, что recalculate_ratings находит расхождения.'
+        )
+        assert self.get_rating(title_id) == (7, 1, 7), (
+            'Проверьте, что с --dry-run рейтинги не изменяются.'
+        )
+
+        generations = get_generations(cache, (Title,))
+        call_command('recalculate_ratings', stdout=StringIO())
+        assert self.get_rating(title_id) == (9, 1, 9)
+        assert get_generations(cache, (Title,)) != generations, (
+            'Проверьте, что после пересчёта рейтингов закешированные ответы '
+            'с произведениями становятся недействительными.'
+        )
+        assert self.get_rating(titles[1]['id']) == (0, 0, None)
+
+        output = StringIO()
+        call_command('recalculate_ratings', stdout=output)
+        assert 'Found 0 Title(s)' in output.getvalue()
@@ -0,0 +1,136 @@
+import csv
+import shutil
+from http import HTTPStatus
+from io import StringIO
+from types import SimpleNamespace
+
+import pytest
+from api.serializers import CustomTokenObtainSerializer
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils.dateparse import parse_datetime
+from reviews.management.commands import populate_db
+from reviews.management.commands.populate_db import (PATH, ModelFileMatch,
+                                                     build_stages)
+from reviews.models import Review, Title
+from rest_framework.test import APIClient
+from users.models import CustomUser
+
+
+def count_rows(path):
+    with open(path, encoding='utf8') as file:
+        return sum(1 for _ in csv.reader(file)) - 1
+
+
+@pytest.mark.django_db(transaction=True)
+class Test20PopulateDb:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    @pytest.fixture
+    def data_path(self, tmp_path):
+        return shutil.copytree(PATH, tmp_path / 'data')
+
+    @staticmethod
+    def populate(data_path, **options):
+        output = StringIO()
+        call_command('populate_db', path=data_path, stdout=output, **options)
+        return output.getvalue()
+
+    def test_01_load(self, data_path):
+        self.populate(data_path)
+        assert Title.genre.through.objects.count() == count_rows(
+            data_path / 'genre_title.csv'
+        ), 'Проверьте, что загружаются жанры произведений из genre_title.csv.'
+        assert Review.objects.count() == count_rows(data_path / 'review.csv')
+        assert Title.objects.filter(rating__isnull=False).exists(), (
+            'Проверьте, что после загрузки пересчитываются рейтинги.'
+        )
+        with open(data_path / 'review.csv', encoding='utf8') as file:
+            row = next(csv.DictReader(file))
+        assert Review.objects.get(pk=row['id']).pub_date == parse_datetime(
+            row['pub_date']
+        ), 'Проверьте, что даты публикации отзывов берутся из csv-файла.'
+
+    def test_02_upsert(self, data_path):
+        self.populate(data_path)
+        user = CustomUser.objects.get(username='reviewer')
+        token = CustomTokenObtainSerializer.get_token(user).access_token
+        token_client = APIClient()
+        token_client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        assert token_client.get(self.TITLES_URL).status_code == HTTPStatus.OK
+
+        users_file = data_path / 'users.csv'
+        rows = users_file.read_text(encoding='utf8').rstrip().replace(
+            'reviewer@yamdb.fake,user', 'reviewer@yamdb.fake,moderator'
+        )
+        users_file.write_text(
+            f'{rows}\n105,newcomer,newcomer@yamdb.fake,user,,,\n',
+            encoding='utf8'
+        )
+        output = self.populate(data_path, upsert=True)
+        assert 'CustomUser: 6 Rows, 1 Inserted, 1 Updated, 4 Unchanged' in (
+            output
+        ), 'Проверьте подсчёт вставленных, изменённых и прежних строк.'
+        titles = count_rows(data_path / 'titles.csv')
+        assert (
+            f'Title: {titles} Rows, 0 Inserted, 0 Updated, {titles} Unchanged'
+        ) in output
+
+        user.refresh_from_db()
+        assert user.role == CustomUser.Role.MODERATOR
+        assert user.token_version == 1, (
+            'Проверьте, что смена роли при слиянии отзывает токены.'
+        )
+        response = token_client.get(self.TITLES_URL)
+        assert response.status_code == HTTPStatus.UNAUTHORIZED
+        assert CustomUser.objects.filter(
+            username='newcomer', token_version=0
+        ).exists()
+
+        output = self.populate(data_path, upsert=True)
+        assert 'CustomUser: 6 Rows, 0 Inserted, 0 Updated, 6 Unchanged' in (
+            output
+        )
+
+    def test_03_build_stages(self):
+        assert build_stages(ModelFileMatch) == [
+            [ModelFileMatch.CATEGORY, ModelFileMatch.GENRE,
+             ModelFileMatch.USER],
+            [ModelFileMatch.TITLE],
+            [ModelFileMatch.GENRE_TITLE, ModelFileMatch.REVIEW],
+            [ModelFileMatch.COMMENT],
+        ], 'Проверьте, что файлы загружаются после файлов, на которые '
+        'ссылаются их внешние ключи.'
+
+        first, second = (
+            type(name, (), {'_meta': SimpleNamespace(concrete_fields=[])})
+            for name in ('First', 'Second')
+        )
+        first._meta.concrete_fields.append(
+            SimpleNamespace(is_relation=True, related_model=second)
+        )
+        second._meta.concrete_fields.append(
+            SimpleNamespace(is_relation=True, related_model=first)
+        )
+        with pytest.raises(CommandError, match='Circular Foreign Keys'):
+            build_stages((
+                SimpleNamespace(model=first, value='first.csv'),
+                SimpleNamespace(model=second, value='second.csv'),
+            ))
+
+    def test_04_workers(self, data_path, monkeypatch):
+        output = self.populate(data_path, workers=3)
+        assert 'Loading Files One by One' in output, (
+            'Проверьте, что на SQLite файлы загружаются последовательно.'
+        )
+        Title.objects.all().delete()
+        CustomUser.objects.all().delete()
+
+        monkeypatch.setattr(populate_db, 'SERIAL_VENDORS', ())
+        output = self.populate(data_path, workers=3)
+        assert 'One by One' not in output
+        assert Title.genre.through.objects.count() == count_rows(
+            data_path / 'genre_title.csv'
+        )
+        assert Review.objects.count() == count_rows(data_path / 'review.csv')
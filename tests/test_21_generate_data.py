@@ -0,0 +1,61 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from reviews.management.commands.generate_data import (FIRST_PUB_DATE,
+                                                       PUB_DATE_SPAN)
+from reviews.management.commands.populate_db import ModelFileMatch
+from reviews.models import Review
+
+SIZES = {
+    'titles': 30, 'reviews': 120, 'comments': 200, 'users': 25,
+    'categories': 3, 'genres': 5,
+}
+
+
+def generate(path, **options):
+    call_command(
+        'generate_data', path, stdout=StringIO(), **{**SIZES, **options}
+    )
+    return {
+        match.value: path.joinpath(match.value).read_text(encoding='utf8')
+        for match in ModelFileMatch
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+class Test21GenerateData:
+
+    def test_01_same_seed_same_files(self, tmp_path):
+        first = generate(tmp_path / 'first', seed=7)
+        assert generate(tmp_path / 'second', seed=7) == first, (
+            'Проверьте, что generate_data с одним и тем же seed создаёт '
+            'одинаковые файлы.'
+        )
+        assert generate(tmp_path / 'other', seed=8) != first
+
+    def test_02_load_keeps_pub_dates(self, tmp_path):
+        generate(tmp_path, load=True)
+        assert Review.objects.count() > 1
+        assert not Review.objects.exclude(pub_date__range=(
+            FIRST_PUB_DATE, FIRST_PUB_DATE + PUB_DATE_SPAN
+        )).exists(), (
+            'Проверьте, что даты публикации сгенерированных отзывов '
+            'сохраняются при загрузке.'
+        )
+
+    def test_03_exact_counts(self, tmp_path):
+        files = generate(tmp_path)
+        for match, option in (
+            (ModelFileMatch.REVIEW, 'reviews'),
+            (ModelFileMatch.COMMENT, 'comments'),
+        ):
+            rows = len(files[match.value].splitlines()) - 1
+            assert rows == SIZES[option], (
+                f'Проверьте, что generate_data пишет ровно --{option} '
+                'строк, даже если популярные произведения упираются в '
+                'число пользователей.'
+            )
+        with pytest.raises(CommandError):
+            generate(tmp_path, reviews=SIZES['titles'] * SIZES['users'] + 1)
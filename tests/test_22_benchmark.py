@@ -0,0 +1,63 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from users.models import CustomUser
+
+from tests.utils import create_single_review, create_titles
+
+SCENARIOS = ('titles_list', 'reviews_list', 'signup')
+RESULT_KEYS = {'p50_ms', 'p95_ms', 'p99_ms', 'queries'}
+
+
+@pytest.mark.django_db(transaction=True)
+class Test22Benchmark:
+
+    @staticmethod
+    def benchmark(report, **options):
+        output = StringIO()
+        call_command(
+            'benchmark', iterations=2, warmup=1, only=SCENARIOS,
+            output=report, stdout=output, **options
+        )
+        return json.loads(report.read_text()), output.getvalue()
+
+    @pytest.fixture
+    def catalogue(self, admin_client, user_client):
+        titles, _, _ = create_titles(admin_client)
+        create_single_review(user_client, titles[0]['id'], 'Отзыв', 7)
+
+    def test_01_report(self, catalogue, tmp_path):
+        users = CustomUser.objects.count()
+        report, _ = self.benchmark(tmp_path / 'before.json', label='before')
+        assert set(report['results']) == set(SCENARIOS), (
+            'Проверьте, что `benchmark --only` выполняет только указанные '
+            'сценарии.'
+        )
+        for name, result in report['results'].items():
+            assert RESULT_KEYS <= set(result), (
+                f'Проверьте, что отчёт benchmark содержит {RESULT_KEYS} для '
+                f'сценария {name}.'
+            )
+            assert result['queries'] > 0
+        assert CustomUser.objects.count() == users, (
+            'Проверьте, что записи, сделанные benchmark, откатываются.'
+        )
+
+        _, output = self.benchmark(
+            tmp_path / 'after.json', compare=tmp_path / 'before.json'
+        )
+        assert 'Compared with before:' in output
+        for name in SCENARIOS:
+            assert name in output.split('Compared with before:')[1]
+
+    def test_02_threads(self, catalogue, tmp_path):
+        users = CustomUser.objects.count()
+        report, _ = self.benchmark(tmp_path / 'report.json', threads=2)
+        assert report['threads'] == 2
+        assert report['results']['signup']['errors'] == 0
+        assert CustomUser.objects.count() == users, (
+            'Проверьте, что пользователи, созданные в многопоточном режиме, '
+            'удаляются после прогона.'
+        )